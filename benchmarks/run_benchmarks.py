@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from src.mcmc.diagnostics import effective_sample_size
+from src.mcmc.gibbs_sampling import gibbs_sampler_bivariate_normal
+from src.mcmc.metropolis_hastings import metropolis_sampler, target_pdf_unnormalized
+from src.monte_carlo.integral_estimation import estimate_integral, g
+from src.monte_carlo.option_pricing import monte_carlo_option_price, black_scholes_call
+from src.monte_carlo.pi_estimation import estimate_pi
+
+# Performance benchmarks for the estimators and samplers. Each benchmark runs
+# at several problem sizes and records
+#   throughput                 samples (points, paths, iterations) per second
+#   ess_per_second             effective samples per second (samplers)
+#   work_normalized_variance   std_error^2 * CPU seconds (estimators); for a
+#                              plain Monte Carlo estimator it does not depend
+#                              on the sample size, lower is better
+#   peak_memory_mb             peak traced allocation (Python and NumPy)
+# Results are saved as JSON baselines and can be compared against a previous
+# baseline to flag regressions:
+#   python benchmarks/run_benchmarks.py --save benchmarks/baselines/my_machine.json
+#   python benchmarks/run_benchmarks.py --compare benchmarks/baselines/my_machine.json
+
+SEED = 12345
+
+# Whether a larger value of a metric is better; metrics not listed are informational
+HIGHER_IS_BETTER = {'throughput': True, 'ess_per_second': True,
+                    'work_normalized_variance': False, 'peak_memory_mb': False}
+
+def _bench_pi(size, rng):
+    result = estimate_pi(size, rng=rng, full_output=True)
+    return {'num_samples': size, 'estimate': result.estimate, 'std_error': result.std_error,
+            'abs_error': abs(result.estimate - np.pi)}
+
+def _bench_integral(size, rng):
+    result = estimate_integral(g, 0, 1, size, rng=rng, full_output=True)
+    return {'num_samples': size, 'estimate': result.estimate, 'std_error': result.std_error,
+            'abs_error': abs(result.estimate - 1 / 3)}
+
+def _bench_option(size, rng):
+    S0, K, T, r, sigma, num_steps = 100, 105, 1.0, 0.05, 0.2, 50
+    result = monte_carlo_option_price(S0, K, T, r, sigma, size, num_steps, rng=rng,
+                                      full_output=True)
+    return {'num_samples': size, 'estimate': result.estimate, 'std_error': result.std_error,
+            'abs_error': abs(result.estimate - black_scholes_call(S0, K, T, r, sigma))}
+
+def _bench_metropolis(size, rng):
+    samples, acceptance_rate = metropolis_sampler(target_pdf_unnormalized, 1.0, size, size // 10,
+                                                  rng=rng)
+    return {'num_samples': size, 'ess': float(effective_sample_size(samples[None])),
+            'acceptance_rate': acceptance_rate, 'abs_error': abs(float(np.mean(samples)))}
+
+def _bench_gibbs(size, rng):
+    samples = gibbs_sampler_bivariate_normal(0, 0, 1, 1, 0.8, size, size // 10, rng=rng)
+    return {'num_samples': size, 'ess': float(np.min(effective_sample_size(samples[None]))),
+            'abs_error': float(np.max(np.abs(np.mean(samples, axis=0))))}
+
+# name -> (function(size, rng) returning metrics, problem sizes)
+BENCHMARKS = {
+    'estimate_pi': (_bench_pi, [10**5, 10**6, 10**7]),
+    'estimate_integral': (_bench_integral, [10**5, 10**6, 10**7]),
+    'monte_carlo_option_price': (_bench_option, [10**4, 10**5, 10**6]),
+    'metropolis_sampler': (_bench_metropolis, [10**4, 10**5, 10**6]),
+    'gibbs_sampler_bivariate_normal': (_bench_gibbs, [10**4, 10**5, 10**6]),
+}
+
+def run_benchmark(name, size, repeats=3):
+    """
+    Runs one benchmark at one size and returns its metrics.
+
+    Timings are the best of repeats runs (each with the same seed); peak
+    memory is measured in a separate run under tracemalloc, which slows
+    allocation down and would distort the timings.
+    """
+    func, _ = BENCHMARKS[name]
+    wall_times, cpu_times = [], []
+    for _ in range(repeats):
+        rng = np.random.default_rng(SEED)
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        metrics = func(size, rng)
+        wall_times.append(time.perf_counter() - wall_start)
+        cpu_times.append(time.process_time() - cpu_start)
+
+    tracemalloc.start()
+    func(size, np.random.default_rng(SEED))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    wall, cpu = min(wall_times), min(cpu_times)
+    metrics.update({'wall_time': wall, 'cpu_time': cpu, 'peak_memory_mb': peak / 2**20,
+                    'throughput': metrics['num_samples'] / wall})
+    if 'ess' in metrics:
+        metrics['ess_per_second'] = metrics['ess'] / wall
+    if 'std_error' in metrics:
+        metrics['work_normalized_variance'] = metrics['std_error']**2 * cpu
+    return metrics
+
+def run_suite(names=None, quick=False, repeats=3, verbose=True):
+    """
+    Runs the benchmarks (all by default) at all sizes, or only the smallest if quick.
+
+    Returns:
+        A JSON-serializable dict with the environment under 'meta' and the
+        metrics of each run under 'results', keyed by 'name[n=size]'.
+    """
+    results = {}
+    for name in names or BENCHMARKS:
+        _, sizes = BENCHMARKS[name]
+        for size in sizes[:1] if quick else sizes:
+            key = f"{name}[n={size}]"
+            results[key] = run_benchmark(name, size, repeats)
+            if verbose:
+                print(_format_row(key, results[key]))
+    meta = {'python': platform.python_version(), 'numpy': np.__version__,
+            'platform': platform.platform(), 'processor': platform.processor(),
+            'cpu_count': os.cpu_count(), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    return {'meta': meta, 'results': results}
+
+def compare_results(baseline, current, threshold=0.2):
+    """
+    Compares two run_suite outputs metric by metric.
+
+    A metric regresses when it is worse than the baseline by more than the
+    relative threshold (e.g. 0.2: throughput down more than 20%, or peak
+    memory up more than 20%). Benchmarks missing from either run are skipped.
+
+    Returns:
+        A list of (key, metric, baseline value, current value, relative change)
+        for every regression.
+    """
+    regressions = []
+    for key, metrics in current['results'].items():
+        old_metrics = baseline['results'].get(key)
+        if old_metrics is None:
+            continue
+        for metric, higher_is_better in HIGHER_IS_BETTER.items():
+            if metric not in metrics or metric not in old_metrics or old_metrics[metric] <= 0:
+                continue
+            change = metrics[metric] / old_metrics[metric] - 1.0
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append((key, metric, old_metrics[metric], metrics[metric], change))
+    return regressions
+
+def _format_row(key, metrics):
+    row = (f"{key:<42} {metrics['throughput']:>12.3g}/s  {metrics['peak_memory_mb']:>8.1f} MB")
+    if 'ess_per_second' in metrics:
+        row += f"  ESS/s {metrics['ess_per_second']:.3g}"
+    if 'work_normalized_variance' in metrics:
+        row += f"  SE^2*CPU {metrics['work_normalized_variance']:.3g}"
+    return row
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the estimators and samplers.")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help="Benchmarks to run.")
+    parser.add_argument('--quick', action='store_true', help="Run only the smallest size.")
+    parser.add_argument('--repeats', type=int, default=3, help="Timing repetitions (best is kept).")
+    parser.add_argument('--save', help="Write the results as a JSON baseline to this path.")
+    parser.add_argument('--compare', help="Baseline JSON to compare the results against.")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Relative change counted as a regression (default 0.2).")
+    args = parser.parse_args(argv)
+
+    current = run_suite(args.only, args.quick, args.repeats)
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, current, args.threshold)
+        for key, metric, old, new, change in regressions:
+            print(f"REGRESSION {key} {metric}: {old:.4g} -> {new:.4g} ({change:+.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%}.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
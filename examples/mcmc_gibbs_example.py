@@ -20,13 +20,17 @@ if __name__ == "__main__":
     # Sampler parameters
     num_samples = 10000
     burn_in = 1000
+    # Set to a directory to write the chain to disk chunk by chunk (and resume it
+    # if interrupted); the plots then read a zero-copy np.memmap view
+    store_path = None
 
     print("Running Gibbs Sampler for Bivariate Normal Distribution:")
     print(f"Parameters: mu=({mu1},{mu2}), sigma=({sigma1},{sigma2}), rho={rho}")
     print(f"Sampler: num_samples={num_samples}, burn_in={burn_in}\n")
 
     # Run the sampler
-    samples = gibbs_sampler_bivariate_normal(mu1, mu2, sigma1, sigma2, rho, num_samples, burn_in)
+    samples = gibbs_sampler_bivariate_normal(mu1, mu2, sigma1, sigma2, rho, num_samples, burn_in,
+                                             store=store_path)
 
     print(f"Generated {samples.shape[0]} samples (after burn-in). Shape: {samples.shape}")
     print(f"Sample mean: {np.mean(samples, axis=0)}")
@@ -17,12 +17,18 @@ if __name__ == "__main__":
     proposal_std = 1.0 # Standard deviation for the Normal proposal distribution
     num_samples = 50000
     burn_in = 5000
+    # Set to a directory to write the chain to disk chunk by chunk (and resume it
+    # if interrupted). The plots below then read a zero-copy np.memmap view; a
+    # chain that is still running can be inspected with
+    # src.mcmc.storage.open_samples(store_path).
+    store_path = None
 
     print("Running Metropolis Sampler for target ~ exp(-x^4):")
     print(f"Sampler: proposal_std={proposal_std}, num_samples={num_samples}, burn_in={burn_in}\n")
 
     # Run the sampler
-    samples, acceptance_rate = metropolis_sampler(target_pdf_unnormalized, proposal_std, num_samples, burn_in)
+    samples, acceptance_rate = metropolis_sampler(target_pdf_unnormalized, proposal_std, num_samples, burn_in,
+                                                   store=store_path)
 
     print(f"Generated {len(samples)} samples (after burn-in).")
     print(f"Acceptance Rate: {acceptance_rate:.4f}")
@@ -49,7 +55,7 @@ if __name__ == "__main__":
     norm_constant, _ = quad(target_pdf_unnormalized, -np.inf, np.inf)
     print(f"Normalization constant (estimated): {norm_constant:.4f}")
 
-    x_range = np.linspace(min(samples), max(samples), 500)
+    x_range = np.linspace(np.min(samples), np.max(samples), 500)
     target_pdf_normalized = target_pdf_unnormalized(x_range) / norm_constant
     plt.plot(x_range, target_pdf_normalized, 'r-', lw=2, label='Target PDF (exp(-x^4)/C)')
 
@@ -14,8 +14,9 @@ if __name__ == "__main__":
     print("Estimating Pi using Monte Carlo:")
 
     for num_points in num_points_to_test:
-        pi_estimate = estimate_pi(num_points)
-        print(f"  Number of points: {num_points:<10} | Estimated Pi: {pi_estimate:.6f}")
+        result = estimate_pi(num_points, full_output=True)
+        print(f"  Number of points: {num_points:<10} | Estimated Pi: {result.estimate:.6f}"
+              f" +/- {result.std_error:.6f} | {result.throughput / 1e6:.1f}M points/s")
 
     # Example of how you might add plotting later
     # estimates = [estimate_pi(n) for n in num_points_to_test]
@@ -0,0 +1,406 @@
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import re
+import sysconfig
+import threading
+import types
+from collections import OrderedDict
+import numpy as np
+
+# Content-addressed memoization of simulation runs. A run is identified by a
+# SHA-256 key over the function, its (default-filled) parameters, the seed of
+# its random stream and the library / NumPy versions, so an identical request
+# is answered from the cache instead of being simulated again. The library
+# version is a digest of this package's source, so editing any module (e.g.
+# simulate_paths) changes every key. Functions outside the library are
+# hashed with the module globals they read, recursing into the functions
+# they call. Results live in
+# two tiers: an in-process LRU of unpickled objects (microsecond hits) and a
+# directory of pickle files shared between processes and sessions.
+
+# Subdirectory of the cache directory holding the entries; the cache never
+# touches anything outside it
+_DISK_LAYOUT = 'results-v1'
+
+# Root of this package; its source is covered by library_version()
+_LIBRARY_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Installed code (standard library, site-packages) that is not hashed recursively
+_INSTALLED_DIRS = tuple({os.path.abspath(sysconfig.get_paths()[name])
+                         for name in ('stdlib', 'platstdlib', 'purelib', 'platlib')})
+
+# Functions being fingerprinted on this thread, to cut recursion cycles
+_active = threading.local()
+
+@functools.lru_cache(maxsize=None)
+def library_version():
+    """
+    Hex digest of the source of this package (every .py file under it).
+
+    Computed once per process, so a module edited while a process runs is
+    only noticed by the next process.
+    """
+    hasher = hashlib.sha256()
+    for root, dirs, names in os.walk(_LIBRARY_DIR):
+        dirs.sort()
+        for file_name in sorted(names):
+            if file_name.endswith('.py'):
+                path = os.path.join(root, file_name)
+                hasher.update(os.path.relpath(path, _LIBRARY_DIR).encode() + b'\0')
+                with open(path, 'rb') as f:
+                    hasher.update(f.read())
+    return hasher.hexdigest()
+
+class ResultCache:
+    """
+    Two-tier (memory LRU + disk) cache for seeded simulation runs.
+
+    Results are only cached for calls with an integer seed: the cache turns
+    it into rng=np.random.default_rng(seed), so the run is reproducible and
+    its result is determined by the key. Cached numpy arrays are made
+    read-only, since every hit returns the same object.
+
+    The key covers the function's code, defaults and closure, and for
+    functions outside this library also the module globals they read (with
+    the functions they call, recursively). It does not follow attribute
+    lookups on modules (e.g. settings.SCALE) or state reached only through
+    objects, so clear the cache with invalidate() after changing such state.
+
+    The disk tier stores pickles under directory/results-v1/; only point it
+    at directories you trust.
+
+    Args:
+        directory: Directory of the disk tier, or None for memory only.
+        max_memory_bytes: Size limit of the memory tier (pickled size of
+            the results); least recently used entries are evicted first.
+        max_disk_bytes: Size limit of the disk tier; files used least
+            recently are deleted first.
+        version: Library version included in every key; defaults to
+            library_version(), a digest of this package's source.
+    """
+
+    def __init__(self, directory=None, max_memory_bytes=2**28, max_disk_bytes=2**30,
+                 version=None):
+        self.directory = directory
+        self._root = None if directory is None else os.path.join(directory, _DISK_LAYOUT)
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.version = library_version() if version is None else version
+        self._memory = OrderedDict() # (function name, key) -> (result, size)
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        if directory is not None:
+            os.makedirs(self._root, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+        self._counts = dict(memory_hits=0, disk_hits=0, misses=0, bypassed=0, evictions=0)
+
+    def call(self, func, *args, seed=None, **kwargs):
+        """
+        Returns func(*args, rng=np.random.default_rng(seed), **kwargs), from the cache if possible.
+
+        Without a seed the call runs uncached on func's default random state.
+        """
+        if seed is None:
+            self._counts['bypassed'] += 1
+            return func(*args, **kwargs)
+        name = _function_name(func)
+        key = self.key(func, *args, seed=seed, **kwargs)
+
+        if (name, key) in self._memory:
+            self._memory.move_to_end((name, key))
+            self._counts['memory_hits'] += 1
+            return self._memory[(name, key)][0]
+
+        path = self._path(name, key)
+        if path is not None and os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    payload = f.read()
+                result = pickle.loads(payload)
+                os.utime(path) # Mark as recently used for the disk LRU
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass # Evicted or half-written by another process: recompute
+            else:
+                self._counts['disk_hits'] += 1
+                _make_read_only(result)
+                self._remember(name, key, result, len(payload))
+                return result
+
+        self._counts['misses'] += 1
+        result = func(*args, rng=np.random.default_rng(seed), **kwargs)
+        _make_read_only(result)
+        payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        self._remember(name, key, result, len(payload))
+        if path is not None:
+            self._write(path, payload)
+        return result
+
+    def wrap(self, func):
+        """Returns a version of func whose calls go through call(); pass seed= to cache."""
+        def cached(*args, seed=None, **kwargs):
+            return self.call(func, *args, seed=seed, **kwargs)
+        cached.__name__ = getattr(func, '__name__', 'cached')
+        cached.__doc__ = func.__doc__
+        return cached
+
+    def key(self, func, *args, seed, **kwargs):
+        """Content address of a call: hex SHA-256 of function, parameters, seed and versions."""
+        try:
+            bound = inspect.signature(func).bind(*args, **kwargs)
+        except (TypeError, ValueError) as error:
+            raise TypeError(f"Cannot build a cache key for this call of {_function_name(func)}: "
+                            f"{error}") from error
+        bound.apply_defaults()
+        params = {name: value for name, value in bound.arguments.items() if name != 'rng'}
+        hasher = hashlib.sha256()
+        _fingerprint((func, params, int(seed), self.version, np.__version__), hasher)
+        return hasher.hexdigest()
+
+    def invalidate(self, func=None):
+        """Drops the cached results of func, or everything if func is None."""
+        name = None if func is None else _function_name(func)
+        for entry in [entry for entry in self._memory if name is None or entry[0] == name]:
+            self._memory_bytes -= self._memory.pop(entry)[1]
+        if self.directory is not None:
+            top = self._root if name is None else os.path.join(self._root, _directory_name(name))
+            # Remove only cache entries, then the directories they leave empty
+            for root, _, names in os.walk(top, topdown=False):
+                for file_name in names:
+                    if file_name.endswith('.pkl'):
+                        try:
+                            os.remove(os.path.join(root, file_name))
+                        except FileNotFoundError:
+                            pass
+                if root != self._root:
+                    try:
+                        os.rmdir(root)
+                    except OSError: # Not empty (or already removed)
+                        pass
+            self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+
+    def discard(self, func, *args, seed, **kwargs):
+        """Drops the cached result of one call, if present."""
+        name = _function_name(func)
+        key = self.key(func, *args, seed=seed, **kwargs)
+        if (name, key) in self._memory:
+            self._memory_bytes -= self._memory.pop((name, key))[1]
+        path = self._path(name, key)
+        if path is not None and os.path.exists(path):
+            self._disk_bytes -= os.path.getsize(path)
+            os.remove(path)
+
+    @property
+    def stats(self):
+        """Hit / miss counters and the current size of both tiers."""
+        stats = dict(self._counts, memory_entries=len(self._memory),
+                     memory_bytes=self._memory_bytes, disk_bytes=self._disk_bytes)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+    def _remember(self, name, key, result, size):
+        """Adds a result to the memory tier, evicting least recently used entries."""
+        if size > self.max_memory_bytes:
+            return
+        self._memory[(name, key)] = (result, size)
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, (_, evicted_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+            self._counts['evictions'] += 1
+
+    def _path(self, name, key):
+        if self.directory is None:
+            return None
+        return os.path.join(self._root, _directory_name(name), key + '.pkl')
+
+    def _write(self, path, payload):
+        """Atomically writes one entry, then enforces the disk size limit."""
+        if len(payload) > self.max_disk_bytes:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        self._disk_bytes += len(payload)
+        if self._disk_bytes > self.max_disk_bytes:
+            self._evict_disk()
+
+    def _disk_files(self):
+        """(path, size, last use) of every entry in the disk tier."""
+        files = []
+        for root, _, names in os.walk(self._root):
+            for file_name in names:
+                if file_name.endswith('.pkl'):
+                    path = os.path.join(root, file_name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError: # Removed by another process meanwhile
+                        continue
+                    files.append((path, stat.st_size, stat.st_mtime))
+        return files
+
+    def _evict_disk(self):
+        """Deletes least recently used files until the disk tier fits its limit."""
+        files = sorted(self._disk_files(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self._counts['evictions'] += 1
+        self._disk_bytes = total
+
+def _function_name(func):
+    func = getattr(func, 'py_func', func) # numba functions
+    return f"{getattr(func, '__module__', None)}.{getattr(func, '__qualname__', type(func).__name__)}"
+
+def _directory_name(name):
+    """Portable directory name for a function's entries, e.g. 'test_x._locals_.draws-1a2b...'."""
+    # Qualified names of local functions and lambdas contain '<' and '>'
+    readable = re.sub(r'[^A-Za-z0-9_.-]', '_', name)[:64]
+    return f"{readable}-{hashlib.sha256(name.encode()).hexdigest()[:16]}"
+
+def _is_user_code(func):
+    """Whether func is defined outside this library and outside installed packages."""
+    code_file = getattr(getattr(func, '__code__', None), 'co_filename', '')
+    if not os.path.isfile(code_file):
+        return True # Interactive sessions, exec'd code
+    code_file = os.path.abspath(code_file)
+    return not code_file.startswith((_LIBRARY_DIR + os.sep,) + _INSTALLED_DIRS)
+
+def _code_fingerprint(func):
+    """Hex digest of the code, defaults and closure of a Python function (None for other callables)."""
+    func = getattr(func, 'py_func', func) # numba functions
+    code = getattr(func, '__code__', None)
+    if code is None:
+        return None
+    active = getattr(_active, 'ids', None)
+    if active is None:
+        active = _active.ids = set()
+    if id(func) in active: # Recursive function: its code is already being hashed
+        return 'recursive'
+    active.add(id(func))
+    try:
+        hasher = hashlib.sha256()
+        names = _hash_code(code, hasher)
+        # Default arguments and values captured from enclosing scopes, e.g. the
+        # parameters of a generated integrand
+        _fingerprint((func.__defaults__, func.__kwdefaults__), hasher)
+        for cell in func.__closure__ or ():
+            try:
+                _fingerprint(cell.cell_contents, hasher)
+            except ValueError: # Empty cell
+                hasher.update(b'empty;')
+        if _is_user_code(func):
+            # Module globals the code reads; library and installed code is
+            # covered by the version strings instead
+            module_globals = getattr(func, '__globals__', {})
+            for name in sorted(names):
+                if name in module_globals and not isinstance(module_globals[name], types.ModuleType):
+                    _fingerprint(name, hasher)
+                    _fingerprint(module_globals[name], hasher)
+        return hasher.hexdigest()
+    finally:
+        active.discard(id(func))
+
+def _hash_code(code, hasher):
+    """
+    Hashes the bytecode, names and constants of a code object, without file or line positions.
+
+    Returns:
+        The set of global or attribute names used, including by nested code.
+    """
+    hasher.update(code.co_code)
+    hasher.update(repr((code.co_names, code.co_varnames, code.co_freevars)).encode())
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if hasattr(const, 'co_code'): # Nested function or comprehension
+            names |= _hash_code(const, hasher)
+        else:
+            hasher.update(f"{type(const).__name__}:{const!r};".encode())
+    return names
+
+def _fingerprint(value, hasher):
+    """Feeds a canonical, type-tagged encoding of value into hasher."""
+    if value is None or isinstance(value, (bool, int, float, complex, str)):
+        hasher.update(f"{type(value).__name__}:{value!r};".encode())
+    elif isinstance(value, bytes):
+        hasher.update(b'bytes:' + value + b';')
+    elif isinstance(value, np.generic):
+        _fingerprint(value.item(), hasher)
+    elif isinstance(value, np.ndarray):
+        array = np.ascontiguousarray(value)
+        hasher.update(f"ndarray:{array.dtype.str}:{array.shape};".encode())
+        hasher.update(array.tobytes())
+    elif isinstance(value, (tuple, list)):
+        hasher.update(f"{type(value).__name__}:{len(value)}[".encode())
+        for item in value:
+            _fingerprint(item, hasher)
+        hasher.update(b']')
+    elif isinstance(value, dict):
+        hasher.update(f"dict:{len(value)}{{".encode())
+        for item_key in sorted(value, key=repr):
+            _fingerprint(item_key, hasher)
+            _fingerprint(value[item_key], hasher)
+        hasher.update(b'}')
+    elif isinstance(value, (set, frozenset)):
+        # Order-independent: sort the digests of the items
+        digests = []
+        for item in value:
+            item_hasher = hashlib.sha256()
+            _fingerprint(item, item_hasher)
+            digests.append(item_hasher.hexdigest())
+        hasher.update(f"set:{','.join(sorted(digests))};".encode())
+    elif isinstance(value, np.dtype):
+        hasher.update(f"dtype:{value.str};".encode())
+    elif isinstance(value, functools.partial):
+        hasher.update(b'partial:')
+        _fingerprint((value.func, value.args, value.keywords), hasher)
+    elif isinstance(value, types.MethodType):
+        hasher.update(b'method:')
+        _fingerprint((value.__func__, value.__self__), hasher)
+    elif hasattr(getattr(value, 'py_func', value), '__code__'):
+        # Python (or numba) functions, e.g. integrands and targets
+        hasher.update(f"function:{_function_name(value)}:{_code_fingerprint(value)};".encode())
+    elif isinstance(value, type):
+        # Types such as np.float32; classes defined in user code also hash their methods
+        hasher.update(f"type:{_function_name(value)};".encode())
+        methods = {name: attribute for name, attribute in vars(value).items()
+                   if hasattr(attribute, '__code__')}
+        if any(_is_user_code(method) for method in methods.values()):
+            _fingerprint(methods, hasher)
+    elif isinstance(value, np.ufunc):
+        hasher.update(f"ufunc:{value.__name__};".encode())
+    elif isinstance(value, types.BuiltinFunctionType):
+        # math.sin, or a builtin method bound to an object
+        hasher.update(f"builtin:{_function_name(value)};".encode())
+        if value.__self__ is not None and not isinstance(value.__self__, types.ModuleType):
+            _fingerprint(value.__self__, hasher)
+    elif hasattr(value, '__dict__'):
+        # Callable instances (integrand classes, np.vectorize) and plain
+        # settings objects such as diagnostics.StoppingRule
+        hasher.update(b'object:')
+        _fingerprint(type(value), hasher)
+        _fingerprint(vars(value), hasher)
+    else:
+        raise TypeError(f"Cannot build a cache key from a {type(value).__name__}.")
+
+def _make_read_only(result):
+    """Marks the numpy arrays in a result (and in tuples / lists of it) read-only."""
+    if isinstance(result, np.ndarray):
+        result.flags.writeable = False
+    elif isinstance(result, (tuple, list)):
+        for item in result:
+            _make_read_only(item)
+    elif isinstance(result, dict):
+        for item in result.values():
+            _make_read_only(item)
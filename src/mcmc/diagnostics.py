@@ -0,0 +1,195 @@
+import numpy as np
+
+# Convergence diagnostics for MCMC output, following the split-R-hat and
+# effective sample size definitions of Vehtari et al. (2021) / Stan.
+# Chains are arrays of shape (n_chains, n) or (n_chains, n, d).
+
+def autocovariance(x):
+    """
+    Autocovariance of each row of x at all lags, computed with one FFT.
+
+    Args:
+        x: Array of shape (..., n).
+
+    Returns:
+        Array of shape (..., n) with the biased (1/n) autocovariances.
+    """
+    n = x.shape[-1]
+    centered = x - x.mean(axis=-1, keepdims=True)
+    size = 1 << (2 * n - 1).bit_length() # Zero-pad to avoid circular wrap-around
+    spectrum = np.fft.rfft(centered, size)
+    return np.fft.irfft(spectrum * np.conj(spectrum), size)[..., :n] / n
+
+def _per_dimension(func, chains):
+    """Applies func to (K, n) chains, once per trailing dimension if there is one."""
+    chains = np.asarray(chains, dtype=float)
+    if chains.ndim == 2:
+        return func(chains)
+    return np.array([func(chains[:, :, j]) for j in range(chains.shape[2])])
+
+def _split_rhat_1d(chains):
+    n_half = chains.shape[1] // 2
+    # Each chain becomes two half-chains, dropping the middle draw if n is odd
+    halves = np.concatenate([chains[:, :n_half], chains[:, -n_half:]])
+    within = np.mean(np.var(halves, axis=1, ddof=1))
+    between = n_half * np.var(np.mean(halves, axis=1), ddof=1)
+    var_plus = (n_half - 1) / n_half * within + between / n_half
+    return np.sqrt(var_plus / within)
+
+def split_rhat(chains):
+    """
+    Split R-hat: compares the first and second half of every chain with each other.
+
+    Values close to 1 (e.g. below 1.01) indicate the chains have mixed.
+
+    Args:
+        chains: Array of shape (n_chains, n) or (n_chains, n, d), n >= 4.
+
+    Returns:
+        A float, or an array with one value per dimension.
+    """
+    return _per_dimension(_split_rhat_1d, chains)
+
+def _ess_1d(chains):
+    K, n = chains.shape
+    acov = autocovariance(chains)
+    chain_var = acov[:, 0] * n / (n - 1)
+    within = np.mean(chain_var)
+    var_plus = within * (n - 1) / n
+    if K > 1:
+        var_plus += np.var(np.mean(chains, axis=1), ddof=1)
+    rho = 1.0 - (within - np.mean(acov, axis=0)) / var_plus
+    rho[0] = 1.0
+
+    # Geyer's initial monotone sequence: sum autocorrelation pairs while positive
+    pairs = rho[:n - n % 2].reshape(-1, 2).sum(axis=1)
+    negative = np.nonzero(pairs <= 0)[0]
+    if negative.size:
+        pairs = pairs[:negative[0]]
+    pairs = np.minimum.accumulate(pairs)
+    tau = -1.0 + 2.0 * np.sum(pairs)
+    return K * n / max(tau, 1.0 / np.log10(max(K * n, 10)))
+
+def effective_sample_size(chains):
+    """
+    Effective sample size of all chains together, from FFT autocorrelations.
+
+    Args:
+        chains: Array of shape (n_chains, n) or (n_chains, n, d).
+
+    Returns:
+        A float, or an array with one value per dimension.
+    """
+    return _per_dimension(_ess_1d, chains)
+
+class OnlineDiagnostics:
+    """
+    Split R-hat and ESS for chains that grow chunk by chunk.
+
+    Memory and the cost of each check are bounded by max_batches: every chain
+    is reduced to a series of at most max_batches batch means. When the series
+    is full, neighbouring batches are averaged pairwise and the batch size
+    doubles. While the batch size is 1 the results equal split_rhat and
+    effective_sample_size of the full chains; afterwards they are computed on
+    the batch means, with the ESS rescaled from batch means back to draws by
+    the ratio of their variances.
+
+    Args:
+        n_chains: Number of chains K.
+        dim: Dimension d of each sample, or None for scalar samples.
+        max_batches: Length bound of the batch-mean series per chain.
+    """
+
+    def __init__(self, n_chains, dim=None, max_batches=1024):
+        self.n_chains = n_chains
+        self.dim = dim
+        self.max_batches = max_batches
+        d = 1 if dim is None else dim
+        self.n = 0 # Draws per chain
+        self.batch_size = 1
+        self._batch_means = np.empty((n_chains, 0, d))
+        self._pending_sum = np.zeros((n_chains, d)) # Partial batch
+        self._pending_count = 0
+        # Per-chain running mean and sum of squared deviations of the raw draws
+        self._mean = np.zeros((n_chains, d))
+        self._m2 = np.zeros((n_chains, d))
+
+    def update(self, chunk):
+        """Adds a chunk of shape (n_chains, m) or (n_chains, m, d)."""
+        d = self._mean.shape[1]
+        values = np.asarray(chunk, dtype=float).reshape(self.n_chains, -1, d)
+        m = values.shape[1]
+        if m == 0:
+            return
+
+        # Welford / Chan update of the raw per-chain moments
+        chunk_mean = values.mean(axis=1)
+        total = self.n + m
+        delta = chunk_mean - self._mean
+        self._m2 += ((values - chunk_mean[:, None]) ** 2).sum(axis=1) + delta**2 * (self.n * m / total)
+        self._mean += delta * (m / total)
+        self.n = total
+
+        # Complete the pending batch, then cut the rest into whole batches
+        b = self.batch_size
+        need = b - self._pending_count
+        if m < need:
+            self._pending_sum += values.sum(axis=1)
+            self._pending_count += m
+            return
+        first = (self._pending_sum + values[:, :need].sum(axis=1)) / b
+        rest = values[:, need:]
+        n_full = rest.shape[1] // b
+        full = rest[:, :n_full * b].reshape(self.n_chains, n_full, b, d).mean(axis=2)
+        self._pending_sum = rest[:, n_full * b:].sum(axis=1)
+        self._pending_count = rest.shape[1] - n_full * b
+        self._batch_means = np.concatenate([self._batch_means, first[:, None], full], axis=1)
+
+        while self._batch_means.shape[1] > self.max_batches:
+            self._halve()
+
+    def _halve(self):
+        """Merges neighbouring batches, doubling the batch size."""
+        means = self._batch_means
+        if means.shape[1] % 2:
+            # The odd batch out goes back to the pending partial batch
+            self._pending_sum += means[:, -1] * self.batch_size
+            self._pending_count += self.batch_size
+            means = means[:, :-1]
+        self._batch_means = 0.5 * (means[:, 0::2] + means[:, 1::2])
+        self.batch_size *= 2
+
+    def rhat(self):
+        """Split R-hat (the worst over dimensions); inf until there are 4 batches."""
+        if self._batch_means.shape[1] < 4:
+            return np.inf
+        return float(np.max(split_rhat(self._batch_means)))
+
+    def ess(self):
+        """Effective sample size over all chains (the worst over dimensions)."""
+        if self._batch_means.shape[1] < 4:
+            return 0.0
+        ess_batches = effective_sample_size(self._batch_means)
+        if self.batch_size == 1:
+            return float(np.min(ess_batches))
+        # ESS of the draws = ESS of the batch means * var(draws) / var(batch means)
+        draw_var = np.mean(self._m2 / max(self.n - 1, 1), axis=0)
+        batch_var = np.mean(np.var(self._batch_means, axis=1, ddof=1), axis=0)
+        return float(np.min(ess_batches * draw_var / batch_var))
+
+class StoppingRule:
+    """
+    Stop sampling once ESS >= min_ess and split R-hat < max_rhat.
+
+    Passed as stop_rule to the samplers, which then treat num_samples as an
+    upper bound and check the rule every check_every kept samples per chain.
+    Any callable taking an OnlineDiagnostics and returning a bool works too.
+    """
+
+    def __init__(self, min_ess=400, max_rhat=1.01, check_every=1000):
+        self.min_ess = min_ess
+        self.max_rhat = max_rhat
+        self.check_every = check_every
+
+    def __call__(self, diagnostics):
+        return diagnostics.ess() >= self.min_ess and diagnostics.rhat() < self.max_rhat
@@ -1,42 +1,254 @@
 import numpy as np
+from . import jit
+from .storage import SampleStore
+from .streaming import collect_chunks, iteration_blocks, kept_slice
 # Removed matplotlib import as plotting is moved to examples
 
-def gibbs_sampler_bivariate_normal(mu1, mu2, sigma1, sigma2, rho, num_samples, burn_in):
+def gibbs_sampler_bivariate_normal(mu1, mu2, sigma1, sigma2, rho, num_samples, burn_in, n_chains=None,
+                                   rng=None, store=None, stop_rule=None, monitor=None, backend='numpy'):
     """
     Performs Gibbs sampling for a bivariate normal distribution.
 
+    This is the d = 2 case of gibbs_sampler_gaussian.
+
     Args:
         mu1, mu2: Means of the two variables.
         sigma1, sigma2: Standard deviations of the two variables.
         rho: Correlation coefficient.
         num_samples: Total number of samples to generate (including burn-in).
         burn_in: Number of initial samples to discard.
+        n_chains: If given, run this many independent chains together.
+        rng: Optional numpy Generator to draw from. Defaults to the global
+            np.random state.
+        store: Optional SampleStore directory, see gibbs_sampler_gaussian.
+        stop_rule: Optional convergence criterion, see gibbs_sampler_gaussian.
+        monitor: Optional instrumentation.SamplerMonitor, see gibbs_sampler_gaussian.
+        backend: 'numpy', 'numba' or 'auto', see gibbs_sampler_gaussian.
+
+    Returns:
+        A numpy array of shape (num_samples - burn_in, 2) containing samples,
+        or (n_chains, num_samples - burn_in, 2) with n_chains.
+    """
+    mean = np.array([mu1, mu2], dtype=float)
+    cov = np.array([[sigma1**2, rho * sigma1 * sigma2],
+                    [rho * sigma1 * sigma2, sigma2**2]], dtype=float)
+    return gibbs_sampler_gaussian(mean, cov, num_samples, burn_in, n_chains=n_chains, rng=rng,
+                                  store=store, stop_rule=stop_rule, monitor=monitor,
+                                  backend=backend)
+
+def _gibbs_sweep_matrices(cov):
+    """
+    Writes one systematic-scan Gibbs sweep for N(mean, cov) as a linear map.
+
+    With y = x - mean, sampling every coordinate from its full conditional
+    in turn, y_i | y_-i ~ N(a_i . y_-i, cov_ii - a_i . cov_-i,i) with
+    a_i = cov_-i,-i^+ cov_-i,i, gives y' = B @ y + C @ z for z ~ N(0, I).
+    The conditionals are built from the covariance itself (with a
+    pseudo-inverse), so a singular cov such as rho = +-1 gives conditional
+    standard deviations of 0 instead of failing.
+
+    Returns:
+        B, C: Arrays of shape (d, d).
+    """
+    d = cov.shape[0]
+    B = np.eye(d)
+    C = np.zeros((d, d))
+    for i in range(d):
+        others = np.arange(d) != i
+        # Coefficients of the conditional mean of coordinate i
+        a = np.zeros(d)
+        a[others] = np.linalg.pinv(cov[np.ix_(others, others)]) @ cov[others, i]
+        cond_sd = np.sqrt(max(cov[i, i] - a[others] @ cov[others, i], 0.0))
+        # Rows j < i have already been updated in this sweep, rows j > i have not
+        B[i] = a @ B
+        C[i] = a @ C
+        C[i, i] = cond_sd
+    return B, C
+
+def _affine_recursion_scan(innovations, B):
+    """
+    Solves y_t = B @ y_{t-1} + e_t for a whole block at once.
+
+    innovations holds e_t with shape (n, K, d), where e_0 must already include
+    B @ y_{-1}. After the pass with window w, row t holds
+    sum_{j < 2w} B^j @ e_{t-j}, so log2(n) array passes replace n Python steps.
+    """
+    y = innovations
+    B_power = B
+    w = 1
+    while w < len(y):
+        y[w:] += y[:-w] @ B_power.T
+        B_power = B_power @ B_power
+        w *= 2
+    return y
+
+def gibbs_sampler_gaussian(mean, cov, num_samples, burn_in, n_chains=None, block_size=10000,
+                           rng=None, initial_state=None, thin=1, store=None, stop_rule=None,
+                           monitor=None, backend='numpy'):
+    """
+    Performs Gibbs sampling for a d-dimensional normal distribution.
+
+    The full-conditional updates are linear, so a sweep over all coordinates
+    is precomputed as y' = B @ y + C @ z (see _gibbs_sweep_matrices). Noise is
+    drawn for block_size iterations at a time and turned into innovations
+    C @ z with one matrix product per block. For a few chains the recursion
+    over the block is then solved with a log-depth scan; for many chains one
+    matrix product per iteration over all chains is cheaper. Burn-in states
+    are not stored.
+
+    Args:
+        mean: Mean vector of length d.
+        cov: Covariance matrix of shape (d, d).
+        num_samples: Total number of samples to generate (including burn-in).
+        burn_in: Number of initial samples to discard.
+        n_chains: If given, run this many independent chains together.
+        block_size: Number of iterations whose noise is drawn at once.
+        rng: Optional numpy Generator to draw from. Defaults to the global
+            np.random state.
+        initial_state: Starting point of shape (d,) or (n_chains, d).
+            Defaults to the origin.
+        thin: Keep every thin-th post burn-in sample.
+        store: Optional directory of a storage.SampleStore. Samples are then
+            written there chunk by chunk instead of being kept in memory. If
+            the directory already holds a partial run with the same settings,
+            sampling resumes after its last completed chunk.
+        stop_rule: Optional convergence criterion, e.g.
+            diagnostics.StoppingRule(min_ess=1000, max_rhat=1.01). num_samples
+            is then only an upper bound: the rule is checked on the running
+            diagnostics.OnlineDiagnostics every stop_rule.check_every kept
+            samples, and sampling stops as soon as it returns True.
+        monitor: Optional instrumentation.SamplerMonitor receiving progress
+            callbacks and counting random draws (Gibbs sampling makes no
+            target evaluations and accepts every update).
+        backend: 'numpy', 'numba' or 'auto' (numba if installed). With numba
+            the recursion over each block runs as a compiled loop, which is
+            fastest for a single chain. Falls back to NumPy (with a warning
+            for 'numba') when numba is not installed.
 
     Returns:
-        A numpy array of shape (num_samples - burn_in, 2) containing samples.
+        A numpy array of shape (num_samples - burn_in, d) containing samples,
+        or (n_chains, num_samples - burn_in, d) with n_chains. With a store,
+        this is a read-only np.memmap of the stored chain.
+    """
+    if store is not None:
+        if stop_rule is not None:
+            raise ValueError("stop_rule cannot be combined with store.")
+        return _gibbs_to_store(store, mean, cov, num_samples, burn_in, n_chains, block_size, rng,
+                               initial_state, thin, monitor, backend)
+
+    d = len(mean)
+    K = 1 if n_chains is None else n_chains
+    chunk_size = block_size if stop_rule is None else getattr(stop_rule, 'check_every', 1000)
+    chunks = _gibbs_blocks(mean, cov, num_samples, burn_in, chunk_size, thin, K, block_size,
+                           initial_state, rng, monitor, n_chains is None, backend)
+    samples, _, _ = collect_chunks(((chunk, None) for chunk in chunks),
+                                   (num_samples - burn_in) // thin, K, (d,), stop_rule, monitor)
+
+    if n_chains is None:
+        return samples[0]
+    return samples
+
+def _gibbs_to_store(path, mean, cov, num_samples, burn_in, n_chains, block_size, rng, initial_state,
+                    thin, monitor=None, backend='numpy'):
+    """Runs gibbs_sampler_gaussian into a SampleStore, resuming a partial run if there is one."""
+    rng = np.random if rng is None else rng
+    K = 1 if n_chains is None else n_chains
+    d = len(mean)
+    n_kept = (num_samples - burn_in) // thin
+    shape = (n_kept, d) if n_chains is None else (n_chains, n_kept, d)
+    run = {'sampler': 'gibbs_gaussian', 'mean': np.asarray(mean, dtype=float).tolist(),
+           'cov': np.asarray(cov, dtype=float).tolist(), 'num_samples': num_samples,
+           'burn_in': burn_in, 'thin': thin, 'n_chains': n_chains, 'block_size': block_size}
+    sample_store = SampleStore.open_or_create(path, shape, len(shape) - 2, run)
+
+    num_remaining, burn_in_remaining = num_samples, burn_in
+    if sample_store.n_written > 0:
+        # Continue from the last stored state; burn-in is already done
+        sample_store.restore_rng(rng)
+        initial_state = sample_store.last_state()
+        num_remaining = num_samples - burn_in - sample_store.n_written * thin
+        burn_in_remaining = 0
+
+    if not sample_store.complete:
+        for chunk in _gibbs_blocks(mean, cov, num_remaining, burn_in_remaining, block_size, thin, K,
+                                   block_size, initial_state, rng, monitor, n_chains is None,
+                                   backend):
+            sample_store.append(chunk[0] if n_chains is None else chunk, rng=rng)
+    return sample_store.view()
+
+def gibbs_gaussian_stream(mean, cov, num_samples, burn_in, chunk_size=10000, thin=1, n_chains=None,
+                          initial_state=None, rng=None, block_size=10000, monitor=None,
+                          backend='numpy'):
     """
-    samples = np.zeros((num_samples, 2))
-    x1, x2 = 0.0, 0.0 # Initial state (can be anything)
+    Runs gibbs_sampler_gaussian as a generator of fixed-size chunks of thinned samples.
+
+    Memory is bounded by the chunk and block sizes, so chains far longer than
+    RAM can be consumed on the fly, e.g. by streaming.summarize_stream.
+    Arguments are as for gibbs_sampler_gaussian.
 
-    # Pre-calculate conditional parameters (means depend on the other variable)
-    cond_var1 = sigma1**2 * (1 - rho**2)
-    cond_var2 = sigma2**2 * (1 - rho**2)
-    cond_sd1 = np.sqrt(cond_var1)
-    cond_sd2 = np.sqrt(cond_var2)
+    Args:
+        chunk_size: Number of kept samples per chunk (the last chunk may be
+            shorter). A chunk always ends on the chain's current state.
+        thin: Keep every thin-th post burn-in sample.
+
+    Yields:
+        Arrays of shape (chunk_size, d), or (n_chains, chunk_size, d) with n_chains.
+    """
+    K = 1 if n_chains is None else n_chains
+    for chunk in _gibbs_blocks(mean, cov, num_samples, burn_in, chunk_size, thin, K, block_size,
+                               initial_state, rng, monitor, n_chains is None, backend):
+        yield chunk[0] if n_chains is None else chunk
 
-    for i in range(num_samples):
-        # Sample x1 given x2
-        cond_mean1 = mu1 + (sigma1 / sigma2) * rho * (x2 - mu2)
-        x1 = np.random.normal(cond_mean1, cond_sd1)
+def _gibbs_blocks(mean, cov, num_samples, burn_in, chunk_size, thin, K, block_size, initial_state,
+                  rng, monitor=None, squeeze=False, backend='numpy'):
+    """
+    Core Gibbs loop shared by gibbs_sampler_gaussian and gibbs_gaussian_stream.
+
+    squeeze tells the monitor (if any) to report a single chain without the chain axis.
+
+    Yields:
+        Chunks of kept samples with shape (K, m, d).
+    """
+    mean = np.asarray(mean, dtype=float)
+    cov = np.asarray(cov, dtype=float)
+    d = mean.shape[0]
+    rng = np.random if rng is None else rng
+    B, C = _gibbs_sweep_matrices(cov)
+    # The scan does log2(block_size) times more arithmetic, which only pays off
+    # while the per-iteration cost is interpreter overhead
+    use_scan = K * d <= 32
+    compiled = jit.use_numba(backend)
 
-        # Sample x2 given the *new* x1
-        cond_mean2 = mu2 + (sigma2 / sigma1) * rho * (x1 - mu1)
-        x2 = np.random.normal(cond_mean2, cond_sd2)
+    if initial_state is None:
+        initial_state = np.zeros(d)
+    y = np.broadcast_to(initial_state, (K, d)) - mean # Centered on the mean
+    pieces = []
+    blocks = iteration_blocks(num_samples, burn_in, chunk_size, thin, block_size)
+    if monitor is not None:
+        monitor._start(K, squeeze)
+        blocks = monitor._split(blocks)
 
-        samples[i, :] = [x1, x2]
+    for start, stop, emit in blocks:
+        # Innovations for the whole block: shape (stop - start, K, d)
+        block = rng.standard_normal((stop - start, K, d)) @ C.T
+        if compiled:
+            block = jit.affine_recursion(block, B, np.ascontiguousarray(y))
+        elif use_scan:
+            block[0] += y @ B.T
+            block = _affine_recursion_scan(block, B)
+        else:
+            for t in range(len(block)):
+                y = y @ B.T + block[t]
+                block[t] = y
+        y = block[-1]
+        if monitor is not None:
+            n = stop - start
+            monitor._record(stop, np.full(K, n), y + mean, n * K * d, 0, stop == num_samples)
 
-    # Discard burn-in samples
-    final_samples = samples[burn_in:, :]
-    return final_samples
+        # Keep only the post burn-in, thinned part of the block
+        pieces.append(block[kept_slice(start, stop, burn_in, thin)].transpose(1, 0, 2) + mean)
+        if emit:
+            yield np.concatenate(pieces, axis=1)
+            pieces = []
 
-# --- Removed parameter definitions, execution, and plotting ---
\ No newline at end of file
+# --- Removed parameter definitions, execution, and plotting ---
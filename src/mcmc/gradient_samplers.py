@@ -0,0 +1,200 @@
+import numpy as np
+
+# Gradient-based MCMC for d-dimensional targets: the Metropolis-adjusted
+# Langevin algorithm (MALA) and Hamiltonian Monte Carlo (HMC). Both move all
+# chains together, evaluating the log target and its gradient once per step
+# (per leapfrog step for HMC) for the whole batch of chains, and follow the
+# return contract of metropolis_sampler.
+
+def _evaluate(log_target, grad_log_target, x, batched):
+    """Log-density (K,) and gradient (K, d) at the states x (K, d)."""
+    if batched:
+        return (np.asarray(log_target(x), dtype=float),
+                np.asarray(grad_log_target(x), dtype=float))
+    log_p = np.array([log_target(xi) for xi in x], dtype=float)
+    grad = np.array([grad_log_target(xi) for xi in x], dtype=float)
+    return log_p, grad
+
+class _DualAveraging:
+    """
+    Step-size adaptation by dual averaging (Hoffman & Gelman 2014, Algorithm 5).
+
+    Drives the mean acceptance probability towards target_accept during
+    burn-in; final_step_size is the averaged iterate used afterwards.
+    """
+
+    def __init__(self, step_size, target_accept, gamma=0.05, t0=10.0, kappa=0.75):
+        self.target_accept = target_accept
+        self.mu = np.log(10.0 * step_size)
+        self.gamma, self.t0, self.kappa = gamma, t0, kappa
+        self.h_bar = 0.0
+        self.log_step_bar = 0.0
+        self.m = 0
+
+    def update(self, acceptance_prob):
+        """Returns the step size for the next iteration."""
+        self.m += 1
+        eta = 1.0 / (self.m + self.t0)
+        self.h_bar = (1.0 - eta) * self.h_bar + eta * (self.target_accept - acceptance_prob)
+        log_step = self.mu - np.sqrt(self.m) / self.gamma * self.h_bar
+        weight = self.m ** -self.kappa
+        self.log_step_bar = weight * log_step + (1.0 - weight) * self.log_step_bar
+        return float(np.exp(log_step))
+
+    @property
+    def final_step_size(self):
+        return float(np.exp(self.log_step_bar))
+
+def _run_chains(transition, log_target, grad_log_target, initial_state, step_size, num_samples,
+                burn_in, n_chains, vectorized, adapt, target_accept, rng):
+    """
+    Shared driver: runs transition num_samples times for all chains.
+
+    transition(x, log_p, grad, step_size, evaluate) must return the proposed state with
+    its log-density and gradient, and the log acceptance ratio (K,).
+    """
+    rng = np.random if rng is None else rng
+    K = 1 if n_chains is None else n_chains
+    initial_state = np.asarray(initial_state, dtype=float)
+    d = initial_state.shape[-1]
+    batched = vectorized and n_chains is not None
+    evaluate = lambda x: _evaluate(log_target, grad_log_target, x, batched)
+
+    x = np.array(np.broadcast_to(initial_state, (K, d)))
+    log_p, grad = evaluate(x)
+    samples = np.empty((K, num_samples - burn_in, d))
+    accepted_count = np.zeros(K, dtype=np.int64)
+    adaptation = _DualAveraging(step_size, target_accept) if adapt else None
+
+    for i in range(num_samples):
+        proposed_x, proposed_log_p, proposed_grad, log_ratio = transition(x, log_p, grad, step_size,
+                                                                          evaluate)
+        # NaN ratios (e.g. from a diverging trajectory) are rejected
+        log_ratio = np.where(np.isnan(log_ratio), -np.inf, log_ratio)
+        accept = np.log(rng.uniform(0, 1, K)) < log_ratio
+
+        x = np.where(accept[:, None], proposed_x, x)
+        log_p = np.where(accept, proposed_log_p, log_p)
+        grad = np.where(accept[:, None], proposed_grad, grad)
+        accepted_count += accept
+
+        if adaptation is not None and i < burn_in:
+            step_size = adaptation.update(np.mean(np.exp(np.minimum(log_ratio, 0.0))))
+            if i == burn_in - 1:
+                step_size = adaptation.final_step_size
+        if i >= burn_in:
+            samples[:, i - burn_in] = x
+
+    acceptance_rate = accepted_count / num_samples
+    if n_chains is None:
+        samples, acceptance_rate = samples[0], float(acceptance_rate[0])
+    if adapt:
+        return samples, acceptance_rate, {'step_size': step_size}
+    return samples, acceptance_rate
+
+def mala_sampler(log_target, grad_log_target, initial_state, step_size, num_samples, burn_in,
+                 n_chains=None, vectorized=True, adapt=False, target_accept=0.574, rng=None):
+    """
+    Performs Metropolis-adjusted Langevin (MALA) sampling of a d-dimensional target.
+
+    Proposals follow one Euler step of the Langevin diffusion,
+    x' = x + (step_size^2 / 2) * grad log p(x) + step_size * z, and are
+    accepted with the Metropolis-Hastings ratio, including the correction for
+    the asymmetric proposal.
+
+    Args:
+        log_target: Log of the unnormalized target density.
+        grad_log_target: Gradient of log_target.
+        initial_state: Starting point of shape (d,), broadcast to every chain.
+        step_size: Langevin step size (initial value if adapt).
+        num_samples: Total number of samples to generate.
+        burn_in: Number of initial samples to discard.
+        n_chains: If given, run this many independent chains together.
+        vectorized: Whether log_target and grad_log_target accept a (n_chains, d)
+            array of states. Only used with n_chains; if False they are called
+            once per chain with a (d,) state.
+        adapt: Tune step_size by dual averaging during burn-in, then freeze it.
+        target_accept: Acceptance rate targeted by adapt (0.574 is optimal for MALA).
+        rng: Optional numpy Generator to draw from. Defaults to the global
+            np.random state.
+
+    Returns:
+        Samples of shape (num_samples - burn_in, d), or (n_chains, num_samples - burn_in, d).
+        Acceptance rate (an array with one entry per chain with n_chains).
+        With adapt, also a dict with the tuned 'step_size'.
+    """
+    rng_ = np.random if rng is None else rng
+
+    def log_proposal(to_x, from_x, from_grad, eps):
+        diff = to_x - from_x - 0.5 * eps**2 * from_grad
+        return -np.sum(diff**2, axis=1) / (2.0 * eps**2)
+
+    def transition(x, log_p, grad, eps, evaluate):
+        proposed_x = x + 0.5 * eps**2 * grad + eps * rng_.standard_normal(x.shape)
+        proposed_log_p, proposed_grad = evaluate(proposed_x)
+        log_ratio = (proposed_log_p - log_p
+                     + log_proposal(x, proposed_x, proposed_grad, eps)
+                     - log_proposal(proposed_x, x, grad, eps))
+        return proposed_x, proposed_log_p, proposed_grad, log_ratio
+
+    return _run_chains(transition, log_target, grad_log_target, initial_state, step_size,
+                       num_samples, burn_in, n_chains, vectorized, adapt, target_accept, rng_)
+
+def hmc_sampler(log_target, grad_log_target, initial_state, step_size, num_leapfrog, num_samples,
+                burn_in, n_chains=None, vectorized=True, adapt=False, target_accept=0.65,
+                jitter=0.2, rng=None):
+    """
+    Performs Hamiltonian Monte Carlo sampling of a d-dimensional target.
+
+    Each iteration draws a standard normal momentum and follows the
+    Hamiltonian dynamics for num_leapfrog leapfrog steps of size step_size,
+    integrating all chains at once. The end point is accepted with
+    probability min(1, exp(H_start - H_end)). Each chain's step size is
+    jittered uniformly by +-jitter (relative) per iteration, which avoids
+    trajectories that return to their start when the trajectory length
+    resonates with a scale of the target.
+
+    Args:
+        log_target: Log of the unnormalized target density.
+        grad_log_target: Gradient of log_target.
+        initial_state: Starting point of shape (d,), broadcast to every chain.
+        step_size: Leapfrog step size (initial value if adapt).
+        num_leapfrog: Leapfrog steps per iteration.
+        num_samples: Total number of samples to generate.
+        burn_in: Number of initial samples to discard.
+        n_chains: If given, run this many independent chains together.
+        vectorized: Whether log_target and grad_log_target accept a (n_chains, d)
+            array of states. Only used with n_chains; if False they are called
+            once per chain with a (d,) state.
+        adapt: Tune step_size by dual averaging during burn-in, then freeze it.
+        target_accept: Acceptance rate targeted by adapt.
+        jitter: Relative half-width of the random step-size jitter (0 disables it).
+        rng: Optional numpy Generator to draw from. Defaults to the global
+            np.random state.
+
+    Returns:
+        Samples of shape (num_samples - burn_in, d), or (n_chains, num_samples - burn_in, d).
+        Acceptance rate (an array with one entry per chain with n_chains).
+        With adapt, also a dict with the tuned (un-jittered) 'step_size'.
+    """
+    rng_ = np.random if rng is None else rng
+
+    def transition(x, log_p, grad, step_size, evaluate):
+        momentum = rng_.standard_normal(x.shape)
+        eps = step_size * rng_.uniform(1.0 - jitter, 1.0 + jitter, (len(x), 1))
+        start_energy = -log_p + 0.5 * np.sum(momentum**2, axis=1)
+
+        # Leapfrog: half momentum step, alternating full steps, final half step
+        with np.errstate(over='ignore', invalid='ignore'):
+            new_x = x.copy()
+            new_momentum = momentum + 0.5 * eps * grad
+            for step in range(num_leapfrog):
+                new_x += eps * new_momentum
+                new_log_p, new_grad = evaluate(new_x)
+                scale = 0.5 if step == num_leapfrog - 1 else 1.0
+                new_momentum += scale * eps * new_grad
+            end_energy = -new_log_p + 0.5 * np.sum(new_momentum**2, axis=1)
+        return new_x, new_log_p, new_grad, start_energy - end_energy
+
+    return _run_chains(transition, log_target, grad_log_target, initial_state, step_size,
+                       num_samples, burn_in, n_chains, vectorized, adapt, target_accept, rng_)
@@ -0,0 +1,100 @@
+import time
+from collections import namedtuple
+import numpy as np
+
+# Instrumentation for the Metropolis and Gibbs samplers. A SamplerMonitor
+# passed as monitor= receives a ProgressEvent every `every` iterations and
+# counts random draws and target evaluations. The samplers only touch the
+# monitor once per block of iterations, and without a monitor nothing
+# changes at all, so uninstrumented runs pay no overhead.
+
+ProgressEvent = namedtuple('ProgressEvent', ['iteration', 'acceptance_rate',
+                                             'seconds_per_iteration', 'state'])
+ProgressEvent.__doc__ = """
+Progress report passed to a SamplerMonitor callback.
+
+Fields:
+    iteration: Iterations completed so far (including burn-in).
+    acceptance_rate: Acceptance rate over the iterations since the previous
+        event (per chain with n_chains; always 1 for Gibbs sampling).
+    seconds_per_iteration: Wall-clock time per iteration since the previous event.
+    state: Copy of the current state of the chain(s).
+"""
+
+class SamplerMonitor:
+    """
+    Progress callback and counters for one sampler run.
+
+    With a monitor the samplers cut their blocks of iterations at multiples
+    of every, so the callback sees the exact state after every N iterations.
+    The random stream does not depend on the block sizes, so the samples are
+    the same with and without a monitor (up to rounding in the Gibbs scan).
+
+    Args:
+        callback: Optional function called as callback(event) with a
+            ProgressEvent every `every` iterations and after the last one
+            (also when a stop rule ends the run early).
+        every: Number of iterations between callbacks.
+
+    Attributes (reset at the start of every run):
+        iteration: Iterations completed.
+        rng_draws: Random numbers drawn.
+        target_evaluations: States at which the (log) target was evaluated.
+        accepted: Accepted proposals per chain.
+    """
+
+    def __init__(self, callback=None, every=1000):
+        self.callback = callback
+        self.every = every
+        self._start(1, squeeze=True)
+
+    def _start(self, n_chains, squeeze):
+        """Called by the sampler before its first iteration."""
+        self.iteration = 0
+        self.rng_draws = 0
+        self.target_evaluations = 0
+        self.accepted = np.zeros(n_chains, dtype=np.int64)
+        self._squeeze = squeeze # Report a single chain without the chain axis
+        self._state = None
+        self._last_iteration = 0
+        self._last_accepted = self.accepted.copy()
+        self._last_time = time.perf_counter()
+
+    def _split(self, blocks):
+        """Cuts (start, stop, emit) iteration blocks at multiples of every."""
+        for start, stop, emit in blocks:
+            cut = (start // self.every + 1) * self.every
+            while cut < stop:
+                yield start, cut, False
+                start, cut = cut, cut + self.every
+            yield start, stop, emit
+
+    def _record(self, stop, accepted, state, rng_draws, target_evaluations, final):
+        """Called by the sampler after every block; fires the callback on schedule."""
+        self.iteration = stop
+        self.accepted += accepted
+        self.rng_draws += rng_draws
+        self.target_evaluations += target_evaluations
+        self._state = state
+        if stop % self.every == 0 or final:
+            self._emit()
+
+    def _finish(self):
+        """Called when the run ends early (e.g. by a stop rule); reports the last block."""
+        if self.iteration > self._last_iteration:
+            self._emit()
+
+    def _emit(self):
+        if self.callback is None:
+            return
+        now = time.perf_counter()
+        iterations = max(self.iteration - self._last_iteration, 1)
+        acceptance_rate = (self.accepted - self._last_accepted) / iterations
+        state = np.array(self._state, dtype=float)
+        if self._squeeze:
+            acceptance_rate, state = float(acceptance_rate[0]), state[0]
+        self.callback(ProgressEvent(self.iteration, acceptance_rate,
+                                    (now - self._last_time) / iterations, state))
+        self._last_iteration = self.iteration
+        self._last_accepted = self.accepted.copy()
+        self._last_time = now
@@ -0,0 +1,133 @@
+import functools
+import importlib.util
+import warnings
+import numpy as np
+
+# Optional compiled backend for the sequential inner loops of the samplers.
+# A single Metropolis chain cannot be vectorized over iterations, so its
+# per-step cost is Python interpreter overhead; compiled with numba, the loop
+# (including the call of a jittable target) runs at machine speed. The Gibbs
+# recursion y_t = B y_{t-1} + e_t gets a compiled loop as well. The random
+# numbers are still drawn by NumPy in blocks, so the chains use the same
+# random stream with either backend. numba is optional and slow to import,
+# so it is imported on first use rather than with this module.
+
+BACKENDS = ('numpy', 'numba', 'auto')
+
+NUMBA_AVAILABLE = importlib.util.find_spec('numba') is not None
+
+_UNSET = object()
+numba = _UNSET # The numba module once imported, None if it is not installed
+
+def _import_numba():
+    """The numba module, imported on the first call; None if numba is not installed."""
+    global numba
+    if numba is _UNSET:
+        try:
+            import numba as module
+        except ImportError: # numba is optional; everything falls back to NumPy
+            module = None
+        numba = module
+    return numba
+
+def use_numba(backend):
+    """
+    Resolves a backend name to True (compiled loops) or False (NumPy).
+
+    'auto' uses numba when it is installed; 'numba' without numba installed
+    warns and falls back to NumPy.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}.")
+    if backend == 'numpy':
+        return False
+    if _import_numba() is None:
+        if backend == 'numba':
+            warnings.warn("numba is not installed; falling back to the NumPy backend.",
+                          RuntimeWarning)
+        return False
+    return True
+
+def _jit(func):
+    """func itself if it is already a numba function, else its nopython compilation."""
+    numba = _import_numba()
+    if isinstance(func, numba.core.registry.CPUDispatcher):
+        return func
+    return numba.njit(func)
+
+@functools.lru_cache(maxsize=32)
+def _metropolis_kernel(target_func_unnorm, log_target):
+    """Compiled single-chain Metropolis loop for the given scalar target."""
+    numba = _import_numba()
+    if log_target is not None:
+        compiled_log_target = _jit(log_target)
+    else:
+        target = _jit(target_func_unnorm)
+        compiled_log_target = numba.njit(lambda x: np.log(target(x)))
+
+    @numba.njit
+    def kernel(x, log_target_x, steps, log_us, states):
+        accepted = 0
+        for t in range(steps.shape[0]):
+            proposed_x = x + steps[t]
+            log_target_proposed = compiled_log_target(proposed_x)
+            if log_us[t] < log_target_proposed - log_target_x:
+                x = proposed_x
+                log_target_x = log_target_proposed
+                accepted += 1
+            states[t] = x
+        return x, log_target_x, accepted
+
+    return kernel
+
+def metropolis_kernel(target_func_unnorm, log_target, x, log_target_x):
+    """
+    Compiles the single-chain Metropolis loop for a scalar target.
+
+    The target (log_target if given, else target_func_unnorm) must be
+    compilable by numba in nopython mode, or already be a numba function.
+
+    Returns:
+        kernel(x, log_target_x, steps, log_us, states) -> (x, log_target_x,
+        accepted), which fills states in place, or None (with a warning) if
+        the target cannot be compiled.
+    """
+    try:
+        kernel = _metropolis_kernel(target_func_unnorm, log_target)
+        # Compile now, on a state the chain will actually use
+        kernel(float(x), float(log_target_x), np.zeros(1), np.full(1, -np.inf), np.empty(1))
+        return kernel
+    except Exception as error:
+        warnings.warn(f"Could not compile the target with numba ({type(error).__name__}); "
+                      f"falling back to the NumPy backend.", RuntimeWarning)
+        return None
+
+@functools.lru_cache(maxsize=1)
+def _affine_recursion_kernel():
+    """Compiled loop behind affine_recursion."""
+    numba = _import_numba()
+
+    @numba.njit(cache=True)
+    def kernel(innovations, B, y):
+        n, K, d = innovations.shape
+        previous = y.copy()
+        for t in range(n):
+            for k in range(K):
+                for i in range(d):
+                    value = innovations[t, k, i]
+                    for j in range(d):
+                        value += B[i, j] * previous[k, j]
+                    innovations[t, k, i] = value
+            previous[:, :] = innovations[t]
+        return innovations
+
+    return kernel
+
+def affine_recursion(innovations, B, y):
+    """
+    Compiled y_t = B @ y_{t-1} + e_t over a block, in place (requires numba).
+
+    innovations holds e_t with shape (n, K, d); y is the state (K, d)
+    before the block. Row t of innovations is replaced by y_t.
+    """
+    return _affine_recursion_kernel()(innovations, B, y)
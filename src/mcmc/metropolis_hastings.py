@@ -1,4 +1,8 @@
 import numpy as np
+from scipy.special import ndtri
+from .jit import metropolis_kernel, use_numba
+from .storage import SampleStore
+from .streaming import collect_chunks, iteration_blocks, kept_slice
 # Removed matplotlib and scipy.integrate imports as they are moved to examples
 
 def target_pdf_unnormalized(x):
@@ -6,56 +10,376 @@ def target_pdf_unnormalized(x):
   # Use log-sum-exp trick if needed for numerical stability, not critical here
   return np.exp(-x**4)
 
-def metropolis_sampler(target_func_unnorm, proposal_std, num_samples, burn_in):
+def log_target_unnormalized(x):
+  """Log of the unnormalized target density: -x^4. Works on scalars and arrays."""
+  return -x**4
+
+def _resolve_log_target(target_func_unnorm, log_target):
+    """Returns the log-density callable to use, falling back to log(target_func_unnorm)."""
+    if log_target is not None:
+        return log_target
+    if target_func_unnorm is None:
+        raise ValueError("Either target_func_unnorm or log_target must be given.")
+
+    def log_of_target(x):
+        # A zero density maps to -inf, which is always rejected (the sampler
+        # silences the divide-by-zero warning)
+        return np.log(target_func_unnorm(x))
+    return log_of_target
+
+def _evaluate_batch(log_target, xs, vectorized):
+    """Evaluates the log target for an array of states, in one call if vectorized."""
+    if vectorized:
+        return np.asarray(log_target(xs), dtype=float)
+    return np.array([log_target(x) for x in xs], dtype=float)
+
+def metropolis_sampler(target_func_unnorm, proposal_std, num_samples, burn_in, n_chains=None,
+                       log_target=None, vectorized=True, rng=None, initial_state=0.0, thin=1,
+                       store=None, stop_rule=None, dim=None, proposal_cov=None, adapt=False,
+                       target_accept=None, monitor=None, backend='numpy'):
     """
-    Performs Metropolis sampling for a 1D distribution.
+    Performs Metropolis sampling for a 1D (or, with dim, d-dimensional) distribution.
+
+    The log-density of the current state is cached, so every iteration makes
+    exactly one new target evaluation (for the proposal).
 
     Args:
         target_func_unnorm: Function that computes the unnormalized target density.
+            Ignored when log_target is given (may then be None).
         proposal_std: Standard deviation for the Normal proposal distribution.
+            With proposal_cov it scales the proposal covariance instead.
         num_samples: Total number of samples to generate.
         burn_in: Number of initial samples to discard.
+        n_chains: If given, run this many independent chains together. Every step
+            draws the proposals and uniforms for all chains as arrays and
+            evaluates the log target once for the whole batch.
+        log_target: Function that computes the log of the unnormalized target
+            density. Preferred over target_func_unnorm, since it avoids
+            underflow and an extra log per evaluation.
+        vectorized: Whether the log target accepts an array of states and returns
+            an array of log-densities. Only used with n_chains; if False the
+            target is called once per chain.
+        rng: Optional numpy Generator to draw from. Defaults to the global
+            np.random state.
+        initial_state: Starting point, broadcast to every chain.
+        thin: Keep every thin-th post burn-in sample.
+        store: Optional directory of a storage.SampleStore. Samples are then
+            written there chunk by chunk instead of being kept in memory. If
+            the directory already holds a partial run with the same settings,
+            sampling resumes after its last completed chunk.
+        stop_rule: Optional convergence criterion, e.g.
+            diagnostics.StoppingRule(min_ess=1000, max_rhat=1.01). num_samples
+            is then only an upper bound: the rule is checked on the running
+            diagnostics.OnlineDiagnostics every stop_rule.check_every kept
+            samples, and sampling stops as soon as it returns True.
+        dim: If given, states are vectors of this length and the target is
+            called with arrays of shape (dim,) (or (n_chains, dim) if vectorized).
+        proposal_cov: Optional (dim, dim) proposal covariance; the proposal is
+            then N(x, proposal_std^2 * proposal_cov). Defaults to the identity.
+        adapt: Tune the proposal during burn-in (Robbins-Monro), then freeze it
+            for the sampling phase. The scale proposal_std is driven towards
+            target_accept; with dim, the proposal covariance is also adapted
+            to the running covariance of the chains. Adaptation pools all
+            chains.
+        target_accept: Acceptance rate targeted by adapt. Defaults to 0.44
+            for scalar targets and 0.234 with dim.
+        monitor: Optional instrumentation.SamplerMonitor receiving progress
+            callbacks and counting random draws and target evaluations.
+        backend: 'numpy', 'numba' or 'auto' (numba if installed). With numba,
+            a single scalar chain runs its loop compiled (outside adaptive
+            burn-in); the target must then be jittable in nopython mode, or
+            the sampler warns and falls back to NumPy. See jit.py.
 
     Returns:
         A numpy array of samples (post burn-in).
         Acceptance rate.
+        With adapt, also a dict with the tuned 'proposal_std' (and, with dim,
+        'proposal_cov').
+
+        With n_chains, the samples have shape (n_chains, num_samples - burn_in)
+        and the acceptance rate is an array with one entry per chain. With dim,
+        every sample has a trailing axis of length dim. With a store, the
+        samples are a read-only np.memmap of the stored chain.
+    """
+    proposal = _initial_proposal(proposal_std, proposal_cov, dim)
+    settings = dict(target_func_unnorm=target_func_unnorm, log_target=log_target,
+                    vectorized=vectorized, n_chains=n_chains, dim=dim, thin=thin, rng=rng,
+                    adapt=adapt, target_accept=target_accept, monitor=monitor, backend=backend)
+    if store is not None:
+        if stop_rule is not None:
+            raise ValueError("stop_rule cannot be combined with store.")
+        samples, acceptance_rate = _metropolis_to_store(store, proposal, num_samples, burn_in,
+                                                        initial_state, settings)
+    else:
+        samples, acceptance_rate = _metropolis_in_memory(proposal, num_samples, burn_in,
+                                                         initial_state, stop_rule, settings)
+
+    if n_chains is None:
+        samples, acceptance_rate = samples[0], float(acceptance_rate[0])
+    if adapt:
+        return samples, acceptance_rate, _tuning_result(proposal)
+    return samples, acceptance_rate
+
+def _initial_proposal(proposal_std, proposal_cov, dim):
+    """The proposal as a dict, which adaptation updates in place."""
+    proposal = {'std': float(proposal_std), 'cov': None}
+    if dim is not None:
+        proposal['cov'] = np.eye(dim) if proposal_cov is None else np.array(proposal_cov, dtype=float)
+    return proposal
+
+def _tuning_result(proposal):
+    tuning = {'proposal_std': proposal['std']}
+    if proposal['cov'] is not None:
+        tuning['proposal_cov'] = proposal['cov']
+    return tuning
+
+def _metropolis_in_memory(proposal, num_samples, burn_in, initial_state, stop_rule, settings):
+    """Runs the chains into one array of shape (K, n_kept) + event shape."""
+    K = 1 if settings['n_chains'] is None else settings['n_chains']
+    event = () if settings['dim'] is None else (settings['dim'],)
+    chunk_size = 10000 if stop_rule is None else getattr(stop_rule, 'check_every', 1000)
+    blocks = _metropolis_blocks(proposal, num_samples, burn_in, chunk_size, initial_state,
+                                **settings)
+    samples, accepted_count, stopped = collect_chunks(
+        blocks, (num_samples - burn_in) // settings['thin'], K, event, stop_rule,
+        settings['monitor'])
+    if accepted_count is None:
+        accepted_count = np.zeros(K, dtype=np.int64)
+    iterations = burn_in + samples.shape[1] * settings['thin'] if stopped else num_samples
+    return samples, accepted_count / iterations
+
+def _metropolis_to_store(path, proposal, num_samples, burn_in, initial_state, settings):
+    """Runs the chains into a SampleStore, resuming a partial run if there is one."""
+    n_chains, dim, thin = settings['n_chains'], settings['dim'], settings['thin']
+    settings = dict(settings, rng=np.random if settings['rng'] is None else settings['rng'])
+    K = 1 if n_chains is None else n_chains
+    event = () if dim is None else (dim,)
+    n_kept = (num_samples - burn_in) // thin
+    shape = ((n_kept,) if n_chains is None else (n_chains, n_kept)) + event
+    run = {'sampler': 'metropolis', 'proposal_std': proposal['std'], 'num_samples': num_samples,
+           'burn_in': burn_in, 'thin': thin, 'n_chains': n_chains, 'dim': dim,
+           'adapt': settings['adapt']}
+    sample_store = SampleStore.open_or_create(path, shape, 0 if n_chains is None else 1, run)
+
+    accepted_before = np.zeros(K, dtype=np.int64)
+    num_remaining, burn_in_remaining = num_samples, burn_in
+    if sample_store.n_written > 0:
+        # Continue from the last stored state; burn-in (and adaptation) is already done
+        sample_store.restore_rng(settings['rng'])
+        initial_state = sample_store.last_state()
+        accepted_before = np.array(sample_store.extra['accepted'], dtype=np.int64)
+        proposal['std'] = sample_store.extra['proposal_std']
+        if 'proposal_cov' in sample_store.extra:
+            proposal['cov'] = np.array(sample_store.extra['proposal_cov'])
+        num_remaining = num_samples - burn_in - sample_store.n_written * thin
+        burn_in_remaining = 0
+
+    accepted_count = accepted_before
+    if not sample_store.complete:
+        for chunk, accepted in _metropolis_blocks(proposal, num_remaining, burn_in_remaining, 10000,
+                                                  initial_state, **settings):
+            accepted_count = accepted_before + accepted
+            extra = {'accepted': accepted_count.tolist(), 'proposal_std': proposal['std']}
+            if proposal['cov'] is not None:
+                extra['proposal_cov'] = proposal['cov'].tolist()
+            sample_store.append(chunk[0] if n_chains is None else chunk, rng=settings['rng'],
+                                extra=extra)
+
+    samples = sample_store.view()
+    if n_chains is None:
+        samples = samples[None]
+    return samples, accepted_count / num_samples
+
+def metropolis_stream(target_func_unnorm, proposal_std, num_samples, burn_in, chunk_size=10000,
+                      thin=1, n_chains=None, log_target=None, vectorized=True, initial_state=0.0,
+                      rng=None, dim=None, proposal_cov=None, monitor=None, backend='numpy'):
     """
-    samples = np.zeros(num_samples)
-    current_x = 0.0 # Initial state
-    accepted_count = 0
-
-    for i in range(num_samples):
-        # Propose a new state
-        proposed_x = np.random.normal(current_x, proposal_std)
-
-        # Calculate acceptance probability
-        # Use logs for numerical stability when numbers are very small
-        log_target_current = -current_x**4
-        log_target_proposed = -proposed_x**4
-        log_acceptance_ratio = log_target_proposed - log_target_current
-
-        # alpha = min(1, target(proposed) / target(current))
-        # alpha = min(1, exp(log_target_proposed - log_target_current))
-        # Check if log(alpha) < log(u) where u ~ Uniform(0,1)
-        # is equivalent to alpha < u
-        # In logs: log(alpha) = min(0, log_acceptance_ratio)
-
-        if log_acceptance_ratio >= 0: # P(prop)/P(curr) >= 1 -> alpha = 1
-             acceptance_prob = 1.0
-        else:
-             acceptance_prob = np.exp(log_acceptance_ratio) # P(prop)/P(curr)
-
-        # Decide whether to accept
-        u = np.random.uniform(0, 1)
-        if u < acceptance_prob:
-            current_x = proposed_x
-            accepted_count += 1
-        # else: current_x remains the same
-
-        samples[i] = current_x
-
-    final_samples = samples[burn_in:]
-    acceptance_rate = accepted_count / num_samples
-    return final_samples, acceptance_rate
-
-# --- Removed parameter definitions, execution, and plotting ---
\ No newline at end of file
+    Runs metropolis_sampler as a generator of fixed-size chunks of thinned samples.
+
+    Memory is bounded by the chunk size, so chains far longer than RAM can be
+    consumed on the fly, e.g. by streaming.summarize_stream. Arguments are as
+    for metropolis_sampler.
+
+    Args:
+        chunk_size: Number of kept samples per chunk (the last chunk may be
+            shorter). A chunk always ends on the chain's current state.
+        thin: Keep every thin-th post burn-in sample.
+
+    Yields:
+        Arrays of shape (chunk_size,), or (n_chains, chunk_size) with n_chains
+        (plus a trailing axis of length dim with dim).
+    """
+    proposal = _initial_proposal(proposal_std, proposal_cov, dim)
+    for chunk, _ in _metropolis_blocks(proposal, num_samples, burn_in, chunk_size, initial_state,
+                                       target_func_unnorm, log_target, vectorized, n_chains, dim,
+                                       thin, rng, monitor=monitor, backend=backend):
+        yield chunk[0] if n_chains is None else chunk
+
+def _metropolis_blocks(proposal, num_samples, burn_in, chunk_size, initial_state, target_func_unnorm,
+                       log_target, vectorized, n_chains, dim, thin, rng, adapt=False,
+                       target_accept=None, monitor=None, backend='numpy'):
+    """
+    Core Metropolis loop shared by metropolis_sampler and metropolis_stream.
+
+    Proposal noise and uniforms are drawn for a whole block of iterations at a
+    time. A single scalar chain with a fixed proposal then runs on plain
+    Python floats (or in a compiled loop with the numba backend); otherwise
+    all chains move together with one array operation per step.
+
+    Yields:
+        (chunk, accepted_count): Kept samples of shape (K, m) + event shape and
+        the number of accepted proposals per chain so far.
+    """
+    user_log_target = log_target
+    log_target = _resolve_log_target(target_func_unnorm, log_target)
+    rng = np.random if rng is None else rng
+    K = 1 if n_chains is None else n_chains
+    event = () if dim is None else (dim,)
+    n_noise = 1 if dim is None else dim
+    # A single chain always calls the target with one state
+    batched = vectorized and n_chains is not None
+    # Bound the pre-drawn noise to about 2^20 values per array
+    max_block = max(1, 2**20 // (K * (n_noise + 1)))
+
+    current_x = np.array(np.broadcast_to(initial_state, (K,) + event), dtype=float)
+    with np.errstate(divide='ignore'):
+        log_target_current = _evaluate_batch(log_target, current_x, batched)
+    kernel = None
+    if n_chains is None and dim is None and use_numba(backend):
+        kernel = metropolis_kernel(target_func_unnorm, user_log_target, current_x[0],
+                                   log_target_current[0])
+    adaptation = None
+    if adapt:
+        adaptation = _ProposalAdaptation(proposal, current_x, dim, target_accept)
+    accepted_count = np.zeros(K, dtype=np.int64)
+    pieces = []
+    blocks = iteration_blocks(num_samples, burn_in, chunk_size, thin, max_block)
+    if monitor is not None:
+        monitor._start(K, squeeze=n_chains is None)
+        monitor.target_evaluations += K
+        blocks = monitor._split(blocks)
+
+    for start, stop, emit in blocks:
+        n = stop - start
+        # Random-walk proposals are current + noise, so the noise can be drawn up
+        # front. Both the noise and the acceptance uniforms come from a single
+        # uniform draw, so the random stream does not depend on the block sizes.
+        u = rng.random((n, K, n_noise + 1))
+        z = ndtri(u[:, :, :n_noise])
+        if dim is None:
+            z = z[:, :, 0]
+        tuning = adaptation if start < burn_in else None
+        with np.errstate(divide='ignore'): # log(0) = -inf is a valid value here
+            # Accept where log(u) < log(target(proposed) / target(current))
+            log_u = np.log(u[:, :, n_noise])
+
+            if kernel is not None and tuning is None:
+                states = np.empty(n)
+                current_x[0], log_target_current[0], accepted = kernel(
+                    float(current_x[0]), float(log_target_current[0]), proposal['std'] * z[:, 0],
+                    log_u[:, 0], states)
+                states = states[:, None]
+            elif n_chains is None and dim is None and tuning is None:
+                states, accepted = _single_chain_block(log_target, current_x, log_target_current,
+                                                       (proposal['std'] * z[:, 0]).tolist(),
+                                                       log_u[:, 0].tolist())
+            else:
+                states, accepted, current_x, log_target_current = _array_block(
+                    log_target, batched, proposal, current_x, log_target_current, z, log_u,
+                    tuning, start)
+        accepted_count += accepted
+        if monitor is not None:
+            monitor._record(stop, accepted, current_x, u.size, n * K, stop == num_samples)
+
+        pieces.append(np.swapaxes(states[kept_slice(start, stop, burn_in, thin)], 0, 1))
+        if emit:
+            yield np.concatenate(pieces, axis=1), accepted_count.copy()
+            pieces = []
+
+def _array_block(log_target, batched, proposal, current_x, log_target_current, z, log_u, adaptation,
+                 start):
+    """Moves all chains (scalar or vector states) through a block, one array step per iteration."""
+    n, K = log_u.shape
+    states = np.empty((n,) + current_x.shape)
+    accepted = np.zeros(K, dtype=np.int64)
+    chol = None if proposal['cov'] is None else _proposal_cholesky(proposal['cov'])
+    for t in range(n):
+        step = z[t] if chol is None else z[t] @ chol.T
+        proposed_x = current_x + proposal['std'] * step
+        log_target_proposed = _evaluate_batch(log_target, proposed_x, batched)
+        log_ratio = log_target_proposed - log_target_current
+        accept = log_u[t] < log_ratio
+
+        mask = accept.reshape((K,) + (1,) * (current_x.ndim - 1))
+        current_x = np.where(mask, proposed_x, current_x)
+        log_target_current = np.where(accept, log_target_proposed, log_target_current)
+        accepted += accept
+        states[t] = current_x
+
+        if adaptation is not None:
+            chol = adaptation.update(start + t, log_ratio, current_x)
+    return states, accepted, current_x, log_target_current
+
+class _ProposalAdaptation:
+    """
+    Robbins-Monro tuning of a random-walk proposal during burn-in.
+
+    At iteration t, with step size gamma_t = (t + 1)^-0.6,
+        log(std) += gamma_t * (mean acceptance probability - target_accept).
+    For vector states the running mean and covariance of the chains are used
+    as the proposal covariance (Haario et al. 2001; Andrieu & Thoms 2008),
+    updated with step size 1 / (t + 1 + 10 * dim) so the initial covariance
+    is not replaced by a rank-deficient estimate in the first iterations. The
+    proposal dict is updated in place, so its final values are the frozen,
+    tuned proposal.
+    """
+
+    def __init__(self, proposal, initial_x, dim, target_accept):
+        self.proposal = proposal
+        self.target_accept = target_accept if target_accept is not None else (
+            0.44 if dim is None else 0.234)
+        self.log_std = np.log(proposal['std'])
+        if proposal['cov'] is not None:
+            self.mean = initial_x.mean(axis=0)
+            self.prior_weight = 10 * dim
+
+    def update(self, t, log_ratio, current_x):
+        """Adapts after iteration t; returns the new Cholesky factor (or None)."""
+        gamma = (t + 1.0) ** -0.6
+        acceptance_prob = np.mean(np.exp(np.minimum(log_ratio, 0.0)))
+        self.log_std += gamma * (acceptance_prob - self.target_accept)
+        self.proposal['std'] = float(np.exp(self.log_std))
+        if self.proposal['cov'] is None:
+            return None
+
+        weight = 1.0 / (t + 1.0 + self.prior_weight)
+        self.mean = self.mean + weight * (current_x.mean(axis=0) - self.mean)
+        deviations = current_x - self.mean
+        sample_cov = deviations.T @ deviations / len(current_x)
+        self.proposal['cov'] = self.proposal['cov'] + weight * (sample_cov - self.proposal['cov'])
+        return _proposal_cholesky(self.proposal['cov'])
+
+def _proposal_cholesky(cov):
+    """Cholesky factor of a proposal covariance; the jitter lets a semi-definite one factorize."""
+    return np.linalg.cholesky(cov + 1e-10 * np.eye(len(cov)))
+
+def _single_chain_block(log_target, current_x, log_target_current, steps, log_us):
+    """Runs one chain over a block on Python floats; updates the state arrays in place."""
+    x = float(current_x[0])
+    log_target_x = float(log_target_current[0]) # Cached, only updated on acceptance
+    accepted = 0
+    states = []
+    for step, log_u in zip(steps, log_us):
+        proposed_x = x + step
+        log_target_proposed = log_target(proposed_x)
+        if log_u < log_target_proposed - log_target_x:
+            x = proposed_x
+            log_target_x = log_target_proposed
+            accepted += 1
+        # else: x remains the same
+        states.append(x)
+    current_x[0] = x
+    log_target_current[0] = log_target_x
+    return np.array(states)[:, None], accepted
+
+# --- Removed parameter definitions, execution, and plotting ---
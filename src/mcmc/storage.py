@@ -0,0 +1,141 @@
+import json
+import os
+import numpy as np
+
+# On-disk sample store for long chains. A store is a directory holding
+#   samples.npy    - the full chain, preallocated and written through np.memmap
+#   manifest.json  - how many samples are complete, plus the state to resume from
+# Samples are written one chunk at a time; the manifest is replaced atomically
+# only after the chunk has been flushed, so after a crash it always describes
+# fully written chunks.
+
+SAMPLES_FILE = 'samples.npy'
+MANIFEST_FILE = 'manifest.json'
+
+class SampleStore:
+    """
+    Chunked, memory-mapped .npy store for sampler output.
+
+    Args:
+        path: Store directory. Use SampleStore.open_or_create to make one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+        self.sample_axis = self.manifest['sample_axis']
+        self._samples = None # Writable memmap, opened on first append
+
+    @classmethod
+    def open_or_create(cls, path, shape, sample_axis, run):
+        """
+        Opens the store at path, creating it if needed.
+
+        Args:
+            shape: Shape of the complete chain array.
+            sample_axis: Axis of shape that runs over the samples.
+            run: JSON-serializable sampler settings. Resuming an existing
+                store with different settings raises ValueError.
+        """
+        if os.path.exists(os.path.join(path, MANIFEST_FILE)):
+            store = cls(path)
+            if store.manifest['run'] != run or tuple(store.manifest['shape']) != tuple(shape):
+                raise ValueError(f"Store at {path} was created for a different run: "
+                                 f"{store.manifest['run']}")
+            return store
+
+        os.makedirs(path, exist_ok=True)
+        samples = np.lib.format.open_memmap(os.path.join(path, SAMPLES_FILE), mode='w+',
+                                            dtype=np.float64, shape=tuple(shape))
+        del samples
+        _write_manifest(path, {'shape': list(shape), 'sample_axis': sample_axis, 'run': run,
+                               'n_written': 0, 'rng_state': None, 'extra': {}})
+        return cls(path)
+
+    @property
+    def n_written(self):
+        """Number of samples (per chain) that are safely on disk."""
+        return self.manifest['n_written']
+
+    @property
+    def complete(self):
+        return self.n_written == self.manifest['shape'][self.sample_axis]
+
+    @property
+    def extra(self):
+        """Sampler-specific resume information stored with the last chunk."""
+        return self.manifest['extra']
+
+    def last_state(self):
+        """The last stored sample of every chain, i.e. the state to resume from."""
+        return np.take(self.view(), self.n_written - 1, axis=self.sample_axis)
+
+    def append(self, chunk, rng=None, extra=None):
+        """
+        Writes the next chunk, then records it (and the rng state) in the manifest.
+
+        Args:
+            chunk: Samples with the store's layout, any length along sample_axis.
+            rng: Generator (or np.random module) whose state is saved for resuming.
+            extra: JSON-serializable sampler state to save with the chunk.
+        """
+        if self._samples is None:
+            self._samples = np.load(os.path.join(self.path, SAMPLES_FILE), mmap_mode='r+')
+        m = chunk.shape[self.sample_axis]
+        index = [slice(None)] * self._samples.ndim
+        index[self.sample_axis] = slice(self.n_written, self.n_written + m)
+        self._samples[tuple(index)] = chunk
+        self._samples.flush()
+
+        self.manifest['n_written'] += m
+        self.manifest['rng_state'] = None if rng is None else _rng_state(rng)
+        self.manifest['extra'] = {} if extra is None else extra
+        _write_manifest(self.path, self.manifest)
+
+    def restore_rng(self, rng):
+        """Puts rng back into the state saved with the last chunk (if any)."""
+        if self.manifest['rng_state'] is not None:
+            _set_rng_state(rng, self.manifest['rng_state'])
+
+    def view(self):
+        """Read-only, zero-copy np.memmap view of the completed samples."""
+        return open_samples(self.path)
+
+def open_samples(path):
+    """
+    Opens the completed part of a stored chain as a read-only np.memmap.
+
+    Nothing is loaded into memory, and the store may still be written to by
+    a running sampler; the view covers the chunks completed when it was opened.
+    """
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    samples = np.load(os.path.join(path, SAMPLES_FILE), mmap_mode='r')
+    index = [slice(None)] * samples.ndim
+    index[manifest['sample_axis']] = slice(0, manifest['n_written'])
+    return samples[tuple(index)]
+
+def _write_manifest(path, manifest):
+    """Atomically replaces the manifest, so readers never see a partial file."""
+    tmp_path = os.path.join(path, MANIFEST_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(path, MANIFEST_FILE))
+
+def _rng_state(rng):
+    """JSON-serializable state of a numpy Generator or of the global np.random state."""
+    # np.random itself has a bit_generator submodule, so test the type
+    if isinstance(rng, np.random.Generator):
+        return {'generator': rng.bit_generator.state}
+    name, keys, pos, has_gauss, cached_gaussian = rng.get_state()
+    return {'legacy': [name, keys.tolist(), pos, has_gauss, cached_gaussian]}
+
+def _set_rng_state(rng, state):
+    if isinstance(rng, np.random.Generator):
+        rng.bit_generator.state = state['generator']
+    else:
+        name, keys, pos, has_gauss, cached_gaussian = state['legacy']
+        rng.set_state((name, np.array(keys, dtype=np.uint32), pos, has_gauss, cached_gaussian))
@@ -0,0 +1,227 @@
+import numpy as np
+from .diagnostics import OnlineDiagnostics
+
+# Helpers shared by the streaming samplers (metropolis_stream,
+# gibbs_gaussian_stream) plus reducers that summarize a stream of sample
+# chunks in O(1) memory, without keeping the draws.
+
+def iteration_blocks(num_samples, burn_in, chunk_size, thin, max_block):
+    """
+    Splits a run of num_samples iterations into blocks of at most max_block.
+
+    Blocks never straddle the end of burn-in or the end of an output chunk
+    (chunk_size kept samples, i.e. chunk_size * thin iterations), so a chunk
+    always ends on a kept iteration and the chain's current state is the last
+    sample of the chunk.
+
+    Yields:
+        (start, stop, emit): Iterations [start, stop) form the next block;
+        emit is True when the output chunk is complete after this block.
+    """
+    chunk_iterations = chunk_size * thin
+    start = 0
+    while start < num_samples:
+        if start < burn_in:
+            boundary = burn_in
+        else:
+            boundary = burn_in + ((start - burn_in) // chunk_iterations + 1) * chunk_iterations
+        boundary = min(boundary, num_samples)
+        stop = min(start + max_block, boundary)
+        emit = stop == boundary and (stop > burn_in or stop == num_samples)
+        yield start, stop, emit
+        start = stop
+
+def kept_slice(start, stop, burn_in, thin):
+    """Slice of block [start, stop) holding the kept iterations (post burn-in, every thin-th)."""
+    first = burn_in + thin - 1 # First kept iteration
+    if start > first:
+        first += -(-(start - first) // thin) * thin
+    return slice(max(first - start, 0), max(stop - start, 0), thin)
+
+def collect_chunks(chunks, n_kept, K, event_shape, stop_rule=None, monitor=None):
+    """
+    Gathers the (chunk, extra) pairs of an in-memory sampler run into one array.
+
+    Without a stop rule the run keeps exactly n_kept samples, which are
+    written into one preallocated array. With a stop rule, n_kept is only an
+    upper bound and may be huge, so the chunks are kept in a list and
+    concatenated once the rule is met (checked on OnlineDiagnostics after
+    every chunk) or the run ends; a run stopped early also sends the
+    monitor (if any) its final event.
+
+    Args:
+        chunks: Iterable of (chunk, extra), each chunk of shape (K, m) + event_shape.
+        n_kept: Number of kept samples of a complete run.
+        K: Number of chains.
+        event_shape: Shape of one sample, () for scalars.
+        stop_rule: Optional convergence criterion called with the diagnostics.
+        monitor: Optional instrumentation.SamplerMonitor of the run.
+
+    Returns:
+        The samples with shape (K, n) + event_shape, the extra of the last
+        chunk (None if there was none) and whether the stop rule ended the run.
+    """
+    extra = None
+    if stop_rule is None:
+        samples = np.empty((K, n_kept) + event_shape)
+        filled = 0
+        for chunk, extra in chunks:
+            samples[:, filled:filled + chunk.shape[1]] = chunk
+            filled += chunk.shape[1]
+        return samples[:, :filled], extra, False
+
+    diagnostics = OnlineDiagnostics(K, dim=event_shape[0] if event_shape else None)
+    pieces = []
+    stopped = False
+    for chunk, extra in chunks:
+        pieces.append(chunk)
+        diagnostics.update(chunk)
+        if stop_rule(diagnostics):
+            stopped = True
+            if monitor is not None:
+                monitor._finish()
+            break
+    if not pieces:
+        return np.empty((K, 0) + event_shape), extra, stopped
+    return np.concatenate(pieces, axis=1), extra, stopped
+
+class RunningMoments:
+    """
+    Running mean and covariance of d-dimensional samples, updated per chunk.
+
+    Uses the Welford / Chan et al. pairwise update: each chunk's mean and
+    scatter matrix are merged into the running totals, which is numerically
+    stable and needs O(d^2) memory regardless of the number of samples.
+    """
+
+    def __init__(self, dim=1):
+        self.n = 0
+        self.mean = np.zeros(dim)
+        self._scatter = np.zeros((dim, dim)) # Sum of outer products of deviations
+
+    def update(self, values):
+        """Adds a chunk of shape (m, dim)."""
+        m = values.shape[0]
+        if m == 0:
+            return
+        chunk_mean = values.mean(axis=0)
+        deviations = values - chunk_mean
+        chunk_scatter = deviations.T @ deviations
+
+        total = self.n + m
+        delta = chunk_mean - self.mean
+        self._scatter += chunk_scatter + np.outer(delta, delta) * (self.n * m / total)
+        self.mean = self.mean + delta * (m / total)
+        self.n = total
+
+    @property
+    def covariance(self):
+        """Sample covariance matrix (ddof=1)."""
+        return self._scatter / max(self.n - 1, 1)
+
+    @property
+    def variance(self):
+        return np.diag(self.covariance).copy()
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch for a stream of scalars (KLL-style compactors).
+
+    Level i holds items that each stand for 2^i original values. When a level
+    grows past `size` items it is sorted and every other item is promoted to
+    the next level, so memory stays O(size * log(n / size)) and the rank error
+    stays within a small multiple of n / size.
+    """
+
+    def __init__(self, size=2048):
+        self.size = size
+        self.n = 0
+        self._levels = [np.empty(0)]
+        self._offsets = [0] # Alternating start of the promoted half, per level
+
+    def update(self, values):
+        values = np.ravel(values)
+        self.n += values.size
+        self._levels[0] = np.concatenate([self._levels[0], values])
+        level = 0
+        while level < len(self._levels) and self._levels[level].size > self.size:
+            self._compact(level)
+            level += 1
+
+    def _compact(self, level):
+        items = np.sort(self._levels[level])
+        if items.size % 2:
+            # Keep one item back so an even number is compacted
+            items, leftover = items[:-1], items[-1:]
+        else:
+            leftover = items[:0]
+        offset = self._offsets[level]
+        self._offsets[level] ^= 1
+        if level + 1 == len(self._levels):
+            self._levels.append(np.empty(0))
+            self._offsets.append(0)
+        self._levels[level + 1] = np.concatenate([self._levels[level + 1], items[offset::2]])
+        self._levels[level] = leftover
+
+    def quantile(self, q):
+        """Approximate q-quantile(s) of everything seen so far."""
+        items = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(level.size, 2.0**i) for i, level in enumerate(self._levels)])
+        order = np.argsort(items)
+        cumulative = np.cumsum(weights[order])
+        ranks = np.asarray(q) * cumulative[-1]
+        index = np.minimum(np.searchsorted(cumulative, ranks, side='left'), items.size - 1)
+        return items[order][index]
+
+class StreamSummary:
+    """
+    Reducer for sampler output: running moments plus per-dimension quantile sketches.
+
+    Args:
+        dim: Dimension d of each sample, or None for scalar samples. Chunks of
+            shape (..., d) resp. any shape of scalars are pooled over all
+            leading axes (chains and iterations).
+        quantiles: Probabilities reported by quantiles().
+        sketch_size: Compactor size of each QuantileSketch.
+    """
+
+    def __init__(self, dim=None, quantiles=(0.01, 0.05, 0.5, 0.95, 0.99), sketch_size=2048):
+        self.dim = dim
+        self.probabilities = np.asarray(quantiles)
+        self.moments = RunningMoments(1 if dim is None else dim)
+        self.sketches = [QuantileSketch(sketch_size) for _ in range(self.moments.mean.size)]
+
+    def update(self, chunk):
+        values = np.asarray(chunk, dtype=float).reshape(-1, self.moments.mean.size)
+        self.moments.update(values)
+        for j, sketch in enumerate(self.sketches):
+            sketch.update(values[:, j])
+
+    @property
+    def n(self):
+        return self.moments.n
+
+    @property
+    def mean(self):
+        return self.moments.mean[0] if self.dim is None else self.moments.mean
+
+    @property
+    def variance(self):
+        variance = self.moments.variance
+        return variance[0] if self.dim is None else variance
+
+    @property
+    def covariance(self):
+        return self.moments.covariance
+
+    def quantiles(self):
+        """Array of shape (len(quantiles),), or (len(quantiles), d) for vector samples."""
+        result = np.stack([sketch.quantile(self.probabilities) for sketch in self.sketches], axis=-1)
+        return result[:, 0] if self.dim is None else result
+
+def summarize_stream(stream, dim=None, quantiles=(0.01, 0.05, 0.5, 0.95, 0.99), sketch_size=2048):
+    """Consumes a stream of sample chunks and returns its StreamSummary."""
+    summary = StreamSummary(dim=dim, quantiles=quantiles, sketch_size=sketch_size)
+    for chunk in stream:
+        summary.update(chunk)
+    return summary
@@ -1,22 +1,123 @@
+import time
 import numpy as np # Using numpy for efficient array operations
+from .point_sets import make_point_set, replicate_sizes
+from .results import MonteCarloResult
 
 def g(x):
     """The function we want to integrate."""
     return x**2
 
-def estimate_integral(func, a, b, num_samples):
-    """Estimates the definite integral of func from a to b."""
-    # Generate random numbers uniformly distributed between a and b
-    random_xs = np.random.uniform(a, b, num_samples)
+def estimate_integral(func, a, b, num_samples, rng=None, batch_size=2**20, abs_tol=None,
+                      rel_tol=None, time_budget=None, full_output=False, point_set='pseudo',
+                      n_replicates=None):
+    """
+    Estimates the definite integral of func from a to b.
 
-    # Evaluate the function at these random points
-    function_values = func(random_xs)
+    func is evaluated on batches of at most batch_size points while a running
+    mean and variance of the function values are kept, so memory does not
+    grow with num_samples. With abs_tol, rel_tol or time_budget, num_samples
+    is only an upper bound: sampling stops after the first batch at which the
+    standard error reaches a tolerance or the time budget is used up.
 
-    # Calculate the sample mean of the function values
-    sample_mean = np.mean(function_values)
+    Args:
+        func: Vectorized integrand. For scalar bounds it receives an array of
+            shape (m,); for vector bounds of length d, an array of shape (m, d).
+        a, b: Lower and upper bounds, scalars or arrays describing the
+            hyper-rectangle [a_1, b_1] x ... x [a_d, b_d].
+        num_samples: Number of function evaluations (the maximum, if stopping early).
+        rng: Optional numpy Generator to draw from. Defaults to the global
+            np.random state.
+        batch_size: Number of points evaluated per call of func.
+        abs_tol: Stop once the standard error is at most abs_tol.
+        rel_tol: Stop once the standard error is at most rel_tol * |estimate|.
+        time_budget: Stop after the batch that exceeds this many seconds.
+        full_output: Return a MonteCarloResult with the standard error and the
+            number of evaluations used instead of the bare estimate.
+        point_set: 'pseudo', 'sobol' or 'halton' (see point_sets.make_point_set).
+            Quasi-Monte Carlo points converge faster for smooth integrands.
+        n_replicates: Split the points over this many independently randomized
+            point sets (8 by default for QMC) and take the standard error from
+            the spread of their estimates. Required for a valid error bar with
+            QMC points, whose errors are not independent. num_samples must be
+            at least n_replicates; for Sobol' points each replicate is rounded
+            down to a power of 2.
+
+    Returns:
+        The integral estimate, or a MonteCarloResult if full_output.
+    """
+    rng = np.random if rng is None else rng
+    start_time = time.perf_counter()
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    volume = np.prod(b - a)
+    if point_set != 'pseudo' or n_replicates is not None:
+        return _estimate_integral_replicated(func, a, b, volume, num_samples, rng, batch_size,
+                                             abs_tol, rel_tol, time_budget, full_output,
+                                             point_set, n_replicates or 8, start_time)
+
+    n = 0
+    mean = 0.0
+    sum_sq_dev = 0.0 # Sum of squared deviations from the running mean
+    std_error = np.inf
+    while n < num_samples:
+        m = min(batch_size, num_samples - n)
+        # Generate random points uniformly distributed in the domain
+        random_xs = rng.uniform(a, b, (m,) + a.shape)
+        # Evaluate the function at these random points
+        function_values = func(random_xs)
+
+        # Merge the batch into the running mean and variance (Chan et al.)
+        batch_mean = np.mean(function_values)
+        batch_sum_sq_dev = np.sum((function_values - batch_mean)**2)
+        delta = batch_mean - mean
+        total = n + m
+        mean += delta * m / total
+        sum_sq_dev += batch_sum_sq_dev + delta**2 * n * m / total
+        n = total
+
+        std_error = abs(volume) * np.sqrt(sum_sq_dev / max(n - 1, 1) / n)
+        if abs_tol is not None and std_error <= abs_tol:
+            break
+        if rel_tol is not None and std_error <= rel_tol * abs(volume * mean):
+            break
+        if time_budget is not None and time.perf_counter() - start_time >= time_budget:
+            break
 
     # Calculate the integral estimate
-    integral_estimate = (b - a) * sample_mean
-    return integral_estimate
+    integral_estimate = float(volume * mean)
+    if not full_output:
+        return integral_estimate
+    return MonteCarloResult(integral_estimate, float(std_error), n, time.perf_counter() - start_time)
+
+def _estimate_integral_replicated(func, a, b, volume, num_samples, rng, batch_size, abs_tol, rel_tol,
+                                  time_budget, full_output, point_set, n_replicates, start_time):
+    """Randomized (Q)MC: n_replicates independent point sets, error bar from their spread."""
+    per_replicate, batch_size = replicate_sizes(point_set, num_samples, n_replicates, batch_size)
+    draws = [make_point_set(point_set, max(a.size, 1), rng) for _ in range(n_replicates)]
+    sums = np.zeros(n_replicates)
+    n = 0
+    std_error = np.inf
+    while n < per_replicate:
+        m = min(batch_size, per_replicate - n)
+        for i, draw in enumerate(draws):
+            u = draw(m)
+            random_xs = a + (b - a) * (u[:, 0] if a.ndim == 0 else u)
+            sums[i] += np.sum(func(random_xs))
+        n += m
+
+        replicate_estimates = volume * sums / n
+        integral_estimate = float(np.mean(replicate_estimates))
+        std_error = float(np.std(replicate_estimates, ddof=1) / np.sqrt(n_replicates))
+        if abs_tol is not None and std_error <= abs_tol:
+            break
+        if rel_tol is not None and std_error <= rel_tol * abs(integral_estimate):
+            break
+        if time_budget is not None and time.perf_counter() - start_time >= time_budget:
+            break
+
+    if not full_output:
+        return integral_estimate
+    return MonteCarloResult(integral_estimate, std_error, n * n_replicates,
+                            time.perf_counter() - start_time)
 
-# --- Removed simulation execution code ---
\ No newline at end of file
+# --- Removed simulation execution code ---
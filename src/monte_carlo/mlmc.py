@@ -0,0 +1,195 @@
+import time
+import warnings
+from collections import namedtuple
+import numpy as np
+from .option_pricing import PAYOFFS, PAYOFF_STATISTICS, call_payoffs
+from .paths import PATH_STATISTICS, PathStatistics
+from .results import MonteCarloResult
+
+# Multilevel Monte Carlo (Giles 2008, 2015) for option prices under a time
+# discretization. Level l simulates paths with M^l steps. Its estimator is
+# the mean of P_l - P_{l-1}, where both payoffs come from the same Brownian
+# path (the coarse path sums the fine increments M at a time), so the
+# corrections have small variance and need few of the expensive fine paths.
+# The sum over levels telescopes to an estimate of E[P_L] at the cost of
+# mostly coarse paths.
+
+MLMCLevel = namedtuple('MLMCLevel', ['level', 'num_steps', 'num_samples', 'mean', 'variance', 'cost'])
+MLMCLevel.__doc__ = """
+Summary of one MLMC level.
+
+Fields:
+    level: Level index l.
+    num_steps: Time steps of the fine paths (M^l).
+    num_samples: Number of coupled path pairs simulated.
+    mean: Mean of the correction P_l - P_{l-1} (of P_0 on level 0).
+    variance: Variance of the correction per sample.
+    cost: Cost per sample, in time steps (fine plus coarse).
+"""
+
+SCHEMES = ('euler', 'log_euler')
+
+class _LevelPaths:
+    """Running state and statistics of one batch of paths on one time grid."""
+
+    def __init__(self, S0, n, track):
+        self.prices = np.full(n, float(S0))
+        self.total = np.zeros(n) if 'average' in track else None
+        self.maximum = self.prices.copy() if 'maximum' in track else None
+        self.minimum = self.prices.copy() if 'minimum' in track else None
+        self.num_steps = 0
+
+    def step(self, dt, dW, r, sigma, scheme):
+        if scheme == 'euler':
+            self.prices *= 1.0 + r * dt + sigma * dW
+        else:
+            self.prices *= np.exp((r - 0.5 * sigma**2) * dt + sigma * dW)
+        self.num_steps += 1
+        if self.total is not None:
+            self.total += self.prices
+        if self.maximum is not None:
+            np.maximum(self.maximum, self.prices, out=self.maximum)
+        if self.minimum is not None:
+            np.minimum(self.minimum, self.prices, out=self.minimum)
+
+    def statistics(self):
+        average = None if self.total is None else self.total / self.num_steps
+        return PathStatistics(self.prices, average, self.maximum, self.minimum)
+
+def _level_corrections(S0, K, T, r, sigma, level, n, M, payoff, barrier, scheme, rng):
+    """Discounted P_l - P_{l-1} (P_0 on level 0) for n coupled path pairs."""
+    track = PATH_STATISTICS if callable(payoff) else PAYOFF_STATISTICS[payoff]
+    fine_dt = T / M**level
+    fine = _LevelPaths(S0, n, track)
+    coarse = _LevelPaths(S0, n, track) if level > 0 else None
+
+    for _ in range(M**(level - 1) if level > 0 else 1):
+        coarse_dW = np.zeros(n)
+        for _ in range(M if level > 0 else 1):
+            dW = np.sqrt(fine_dt) * rng.standard_normal(n)
+            fine.step(fine_dt, dW, r, sigma, scheme)
+            coarse_dW += dW
+        if coarse is not None:
+            coarse.step(M * fine_dt, coarse_dW, r, sigma, scheme)
+
+    discount_factor = np.exp(-r * T)
+    corrections = discount_factor * call_payoffs(fine.statistics(), K, payoff, barrier)
+    if coarse is not None:
+        corrections = corrections - discount_factor * call_payoffs(coarse.statistics(), K,
+                                                                   payoff, barrier)
+    return corrections
+
+def _decay_rate(values, M, default):
+    """Rate a in values[l] ~ M^(-a l), fitted over levels l >= 1 with positive values."""
+    levels = np.arange(len(values))[1:]
+    values = np.asarray(values[1:])
+    positive = values > 0
+    if np.count_nonzero(positive) < 2:
+        return default
+    return max(0.5, -np.polyfit(levels[positive], np.log(values[positive]) / np.log(M), 1)[0])
+
+def mlmc_option_price(S0, K, T, r, sigma, target_rmse, payoff='european', barrier=None,
+                      scheme='euler', M=2, min_level=2, max_level=10, initial_samples=1000,
+                      rng=None, batch_size=2**16, full_output=False):
+    """
+    Prices a call by multilevel Monte Carlo to a target root-mean-square error.
+
+    Follows Giles' adaptive algorithm. Each level starts with initial_samples
+    path pairs. After every round, the variance V_l and cost C_l of each level
+    give the optimal sample counts N_l = 2 / target_rmse^2 * sqrt(V_l / C_l)
+    * sum_k sqrt(V_k C_k), which keep the estimator variance below
+    target_rmse^2 / 2. Once the counts are met, the remaining bias is
+    extrapolated from the means of the finest levels (mean ~ M^(-alpha l))
+    and a finer level is added until the bias is below target_rmse / sqrt(2).
+
+    Args:
+        S0, K, T, r, sigma: Contract and model parameters.
+        target_rmse: Desired root-mean-square error.
+        payoff, barrier: As in monte_carlo_option_price; path statistics
+            (average, maximum, minimum) are taken over each level's time grid.
+        scheme: 'euler' (Euler-Maruyama on S, weak order 1) or 'log_euler'
+            (exact for GBM at the grid points, so only the monitoring of
+            path-dependent payoffs is discretized).
+        M: Refinement factor between levels.
+        min_level, max_level: Range of the finest level L.
+        initial_samples: Path pairs simulated on a level when it is added.
+        rng: Optional numpy Generator to draw from. Defaults to the global
+            np.random state.
+        batch_size: Maximum number of path pairs simulated at once.
+        full_output: Also return the per-level summaries.
+
+    Returns:
+        The price, or with full_output a MonteCarloResult (its std_error is the
+        sampling error only, without the bias; num_samples counts path pairs
+        over all levels) and a list of MLMCLevel.
+    """
+    rng = np.random if rng is None else rng
+    if scheme not in SCHEMES:
+        raise ValueError(f"Unknown scheme {scheme!r}; expected one of {SCHEMES}.")
+    if not callable(payoff) and payoff not in PAYOFFS:
+        raise ValueError(f"Unknown payoff {payoff!r}; expected one of {PAYOFFS}.")
+    if payoff in ('up_and_out', 'down_and_out') and barrier is None:
+        raise ValueError(f"The {payoff} payoff needs a barrier level.")
+    start_time = time.perf_counter()
+
+    L = min_level
+    num_samples = np.zeros(L + 1, dtype=np.int64)
+    sums = np.zeros(L + 1) # Sums of the corrections
+    sums_sq = np.zeros(L + 1) # Sums of their squares
+    costs = np.array([M**l + (M**(l - 1) if l > 0 else 0) for l in range(L + 1)], dtype=float)
+    extra = np.full(L + 1, initial_samples, dtype=np.int64)
+
+    while np.any(extra > 0):
+        for l in np.nonzero(extra)[0]:
+            done = 0
+            while done < extra[l]:
+                n = int(min(batch_size, extra[l] - done))
+                corrections = _level_corrections(S0, K, T, r, sigma, l, n, M, payoff, barrier,
+                                                 scheme, rng)
+                sums[l] += corrections.sum()
+                sums_sq[l] += (corrections**2).sum()
+                done += n
+            num_samples[l] += extra[l]
+
+        means = sums / num_samples
+        variances = np.maximum(sums_sq / num_samples - means**2, 0.0)
+        alpha = _decay_rate(np.abs(means), M, 1.0)
+        beta = _decay_rate(variances, M, 1.0)
+
+        # Optimal sample counts for a variance of target_rmse^2 / 2
+        optimal = np.ceil(2.0 / target_rmse**2 * np.sqrt(variances / costs)
+                          * np.sum(np.sqrt(variances * costs)))
+        extra = np.maximum(optimal.astype(np.int64) - num_samples, 0)
+
+        if np.all(extra <= 0.01 * num_samples):
+            # Extrapolated bias of the finest level, from the means of up to three
+            # finest correction levels (level 0 estimates the price, not a correction)
+            remaining = max(np.abs(means[L - i]) / float(M)**(alpha * i)
+                            for i in range(min(3, L))) / (float(M)**alpha - 1.0)
+            if remaining > target_rmse / np.sqrt(2):
+                if L == max_level:
+                    warnings.warn(f"MLMC reached max_level={max_level} without meeting the bias "
+                                  f"target; the result may not reach target_rmse.")
+                    break
+                L += 1
+                # Add level L, starting from the variance extrapolated from level L - 1
+                variances = np.append(variances, variances[-1] / float(M)**beta)
+                num_samples = np.append(num_samples, 0)
+                sums, sums_sq = np.append(sums, 0.0), np.append(sums_sq, 0.0)
+                costs = np.append(costs, M**L + M**(L - 1))
+                optimal = np.ceil(2.0 / target_rmse**2 * np.sqrt(variances / costs)
+                                  * np.sum(np.sqrt(variances * costs)))
+                extra = np.maximum(optimal.astype(np.int64) - num_samples, 0)
+                extra[L] = max(extra[L], initial_samples)
+
+    means = sums / num_samples
+    variances = np.maximum(sums_sq / num_samples - means**2, 0.0)
+    price = float(np.sum(means))
+    if not full_output:
+        return price
+    std_error = float(np.sqrt(np.sum(variances / num_samples)))
+    result = MonteCarloResult(price, std_error, int(num_samples.sum()),
+                              time.perf_counter() - start_time)
+    levels = [MLMCLevel(l, M**l, int(num_samples[l]), float(means[l]), float(variances[l]),
+                        float(costs[l])) for l in range(L + 1)]
+    return result, levels
@@ -1,44 +1,320 @@
+import time
 import numpy as np
 from scipy.stats import norm # Keep for black_scholes comparison if needed later
+from .paths import PATH_STATISTICS, simulate_paths
+from .point_sets import (make_point_set, replicate_sizes, uniform_to_normal,
+                         brownian_bridge_increments)
+from .results import MonteCarloResult
 
-def monte_carlo_option_price(S0, K, T, r, sigma, num_simulations, num_steps):
-    """Estimates European call option price using Monte Carlo."""
-    dt = T / num_steps
+PAYOFFS = ('european', 'asian', 'up_and_out', 'down_and_out', 'lookback')
+
+# Path statistics each payoff needs besides the terminal price
+PAYOFF_STATISTICS = {'european': (), 'asian': ('average',), 'up_and_out': ('maximum',),
+                     'down_and_out': ('minimum',), 'lookback': ('minimum',)}
+
+# Paths per Brownian-bridge block for QMC (a power of 2 keeps Sobol' points balanced)
+_QMC_BLOCK = 2**14
+
+def call_payoffs(stats, K, payoff, barrier):
+    """
+    Undiscounted call payoffs of the paths summarized by stats.
+
+    Shared by monte_carlo_option_price, mlmc_option_price and the pricing
+    service, which simulate the paths in their own ways.
+
+    Args:
+        stats: PathStatistics holding at least PAYOFF_STATISTICS[payoff].
+        K: Strike price (broadcast against the statistics).
+        payoff: A name from PAYOFFS, or a callable payoff(stats, K).
+        barrier: Barrier level of the knock-out payoffs.
+    """
+    if callable(payoff):
+        return payoff(stats, K)
+    european = np.maximum(stats.terminal - K, 0)
+    if payoff == 'european':
+        return european
+    if payoff == 'asian':
+        return np.maximum(stats.average - K, 0)
+    if payoff == 'up_and_out':
+        return np.where(stats.maximum < barrier, european, 0)
+    if payoff == 'down_and_out':
+        return np.where(stats.minimum > barrier, european, 0)
+    return stats.terminal - stats.minimum # Floating-strike lookback call
+
+def _simulate_payoffs(S0, K, T, r, sigma, num_simulations, num_steps, rng, normals, payoff,
+                      barrier, dtype):
+    """Discounted payoffs (float64) and the PathStatistics of one batch of paths."""
+    track = PATH_STATISTICS if callable(payoff) else PAYOFF_STATISTICS[payoff]
+    stats = simulate_paths(S0, T, r, sigma, num_simulations, num_steps, rng=rng, normals=normals,
+                           track=track, dtype=dtype)
+    payoffs = np.asarray(call_payoffs(stats, K, payoff, barrier), dtype=float)
+    return np.exp(-r * T) * payoffs, stats
+
+CONTROL_VARIATES = ('terminal', 'black_scholes')
+
+def monte_carlo_option_price(S0, K, T, r, sigma, num_simulations, num_steps, rng=None,
+                             point_set='pseudo', n_replicates=None, full_output=False,
+                             antithetic=False, moment_matching=False, control_variate=None,
+                             payoff='european', barrier=None, dtype=np.float64):
+    """
+    Estimates European call option price using Monte Carlo.
+
+    Draws come from rng (a numpy Generator) if given, else the global np.random state.
+
+    Paths are advanced step by step (see paths.simulate_paths), keeping only
+    the per-path statistics the payoff needs, so memory is O(num_simulations)
+    regardless of num_steps. payoff selects the contract:
+        'european': max(S(T) - K, 0).
+        'asian': max(A - K, 0), A the arithmetic average over the num_steps
+            monitoring dates.
+        'up_and_out' / 'down_and_out': the European payoff, knocked out if
+            the price reaches barrier at any grid point (discrete monitoring).
+        'lookback': floating-strike lookback call S(T) - min S (K unused).
+    Any callable payoff(stats, K) taking a PathStatistics works too.
+
+    With a quasi-Monte Carlo point_set ('sobol' or 'halton') every path uses
+    one num_steps-dimensional point, turned into Brownian increments by a
+    Brownian-bridge construction so that the first coordinates carry most of
+    the variance. The simulations are then split over n_replicates (default 8)
+    independently scrambled point sets and the standard error comes from the
+    spread of the replicate prices. num_simulations must be at least
+    n_replicates; for Sobol' points each replicate is rounded down to a power
+    of 2.
+
+    Variance reduction (pseudo-random points only):
+        antithetic: Simulate every path together with its mirror image (-Z)
+            and average each pair.
+        moment_matching: Rescale the normals of every time step to sample mean
+            0 and variance 1. This couples the paths, so they are simulated in
+            16 independent groups and the standard error comes from the
+            spread of the group prices.
+        control_variate: 'terminal' uses the discounted terminal price, whose
+            mean is S0; 'black_scholes' uses the discounted European call
+            payoff, whose mean is black_scholes_call, and is rejected for the
+            European payoff, which it equals. The regression coefficient is
+            estimated from the same paths.
+
+    dtype=np.float32 runs the path state in single precision; payoffs are
+    averaged in double precision.
+
+    Returns:
+        The price, or with full_output a MonteCarloResult holding the price,
+        its standard error, the number of paths, the elapsed time and the
+        variance reduction factor: the estimated variance of a plain Monte
+        Carlo price from as many paths, divided by the achieved variance.
+    """
+    rng = np.random if rng is None else rng
+    start_time = time.perf_counter()
+    if control_variate is not None and control_variate not in CONTROL_VARIATES:
+        raise ValueError(f"Unknown control variate {control_variate!r}; "
+                         f"expected one of {CONTROL_VARIATES}.")
+    if not callable(payoff) and payoff not in PAYOFFS:
+        raise ValueError(f"Unknown payoff {payoff!r}; expected one of {PAYOFFS}.")
+    if payoff in ('up_and_out', 'down_and_out') and barrier is None:
+        raise ValueError(f"The {payoff} payoff needs a barrier level.")
+    if control_variate == 'black_scholes' and payoff == 'european':
+        raise ValueError("The 'black_scholes' control variate is the European payoff itself; "
+                         "use it for other payoffs or use control_variate='terminal'.")
+    variance_reduced = antithetic or moment_matching or control_variate is not None
+    contract = (K, payoff, barrier, dtype)
+
+    if point_set == 'pseudo' and n_replicates is None and not variance_reduced:
+        discounted, _ = _simulate_payoffs(S0, K, T, r, sigma, num_simulations, num_steps, rng,
+                                          None, payoff, barrier, dtype)
+
+        # The price is the average discounted payoff
+        option_price = np.mean(discounted)
+        std_error = np.std(discounted, ddof=1) / np.sqrt(num_simulations)
+        plain_variance = np.var(discounted, ddof=1)
+    elif point_set == 'pseudo' and n_replicates is None:
+        option_price, std_error, num_simulations, plain_variance = _variance_reduced_price(
+            S0, T, r, sigma, num_simulations, num_steps, rng, antithetic, moment_matching,
+            control_variate, contract)
+    elif variance_reduced:
+        raise ValueError("Variance reduction options require point_set='pseudo' without n_replicates.")
+    else:
+        n_replicates = 8 if n_replicates is None else n_replicates
+        per_replicate, block_size = replicate_sizes(point_set, num_simulations, n_replicates,
+                                                     _QMC_BLOCK)
+        num_simulations = per_replicate * n_replicates
+        replicate_prices = np.empty(n_replicates)
+        plain_variance = 0.0
+        for i in range(n_replicates):
+            draw = make_point_set(point_set, num_steps, rng)
+            discounted = []
+            # Bridge the paths block by block to keep memory O(block * num_steps)
+            for block_start in range(0, per_replicate, block_size):
+                m = min(block_size, per_replicate - block_start)
+                Z = brownian_bridge_increments(uniform_to_normal(draw(m)))
+                block, _ = _simulate_payoffs(S0, K, T, r, sigma, m, num_steps, rng, Z.T, payoff,
+                                             barrier, dtype)
+                discounted.append(block)
+            discounted = np.concatenate(discounted)
+            replicate_prices[i] = np.mean(discounted)
+            plain_variance += np.var(discounted, ddof=1) / n_replicates
+        option_price = np.mean(replicate_prices)
+        std_error = np.std(replicate_prices, ddof=1) / np.sqrt(n_replicates)
+
+    if not full_output:
+        return option_price
+    achieved_variance = std_error**2 * num_simulations
+    variance_reduction = plain_variance / achieved_variance if achieved_variance > 0 else np.inf
+    return MonteCarloResult(float(option_price), float(std_error), num_simulations,
+                            time.perf_counter() - start_time, float(variance_reduction))
+
+def _pseudo_normals(rng, num_steps, n_draws, antithetic, moment_matching):
+    """Yields the normals of every time step, mirrored and/or moment matched."""
+    for _ in range(num_steps):
+        z = rng.standard_normal(n_draws)
+        if antithetic:
+            z = np.concatenate([z, -z])
+        if moment_matching:
+            z = (z - z.mean()) / z.std()
+        yield z
+
+def _variance_reduced_price(S0, T, r, sigma, num_simulations, num_steps, rng, antithetic,
+                            moment_matching, control_variate, contract):
+    """
+    Pseudo-random price with antithetic variates, moment matching and/or a control variate.
+
+    Returns the price, its standard error, the number of paths used and the
+    per-path variance of the plain (unadjusted) discounted payoffs.
+    """
+    K, payoff, barrier, dtype = contract
     discount_factor = np.exp(-r * T)
+    n_groups = 16 if moment_matching else 1
+    # Every group needs two independent units (pairs with antithetic) for a spread
+    min_paths = 2 * n_groups * (2 if antithetic else 1)
+    if num_simulations < min_paths:
+        raise ValueError(f"Variance reduction with these options needs at least {min_paths} "
+                         f"paths; got num_simulations={num_simulations}.")
+    group_paths = num_simulations // n_groups
+    n_draws = group_paths // 2 if antithetic else group_paths # Independent normal vectors per group
 
-    # Pre-generate random numbers for efficiency
-    # Z ~ N(0,1) -> shape (num_steps, num_simulations)
-    Z = np.random.standard_normal((num_steps, num_simulations))
+    payoffs, controls = [], []
+    for _ in range(n_groups):
+        normals = _pseudo_normals(rng, num_steps, n_draws, antithetic, moment_matching)
+        n_paths = 2 * n_draws if antithetic else n_draws
+        discounted, stats = _simulate_payoffs(S0, K, T, r, sigma, n_paths, num_steps, rng, normals,
+                                              payoff, barrier, dtype)
+        payoffs.append(discounted)
+        final_prices = np.asarray(stats.terminal, dtype=float)
+        if control_variate == 'terminal':
+            controls.append(discount_factor * final_prices)
+        elif control_variate == 'black_scholes':
+            controls.append(discount_factor * np.maximum(final_prices - K, 0))
+    payoffs = np.array(payoffs) # (n_groups, paths per group)
+    plain_variance = np.var(payoffs, ddof=1)
+    # Antithetic pairs (path i and its mirror i + n_draws) are the independent units
+    def pair_up(values):
+        return 0.5 * (values[:, :n_draws] + values[:, n_draws:]) if antithetic else values
+    units = pair_up(payoffs)
 
-    # Initialize stock price array: shape (num_steps + 1, num_simulations)
-    S = np.zeros((num_steps + 1, num_simulations))
-    S[0, :] = S0
+    if control_variate is not None:
+        control_mean = S0 if control_variate == 'terminal' else black_scholes_call(S0, K, T, r, sigma)
+        control_units = pair_up(np.array(controls))
+        control_var = np.var(control_units)
+        # beta = Cov(Y, X) / Var(X); a control equal to a constant gets no weight
+        beta = 0.0 if control_var == 0 else np.mean(
+            (units - units.mean()) * (control_units - control_units.mean())) / control_var
+        units = units - beta * (control_units - control_mean)
 
-    # Simulate price paths
-    for t in range(1, num_steps + 1):
-        drift = (r - 0.5 * sigma**2) * dt
-        diffusion = sigma * np.sqrt(dt) * Z[t-1, :] # Use pre-generated Z for this step
-        S[t, :] = S[t-1, :] * np.exp(drift + diffusion)
+    if n_groups > 1:
+        group_prices = units.mean(axis=1)
+        std_error = np.std(group_prices, ddof=1) / np.sqrt(n_groups)
+    else:
+        std_error = np.std(units, ddof=1) / np.sqrt(units.size)
+    return np.mean(units), std_error, payoffs.size, plain_variance
 
-    # Get final stock prices (at time T)
-    final_prices = S[-1, :] # Last row contains prices at T
+def merge_moments(mean, m2, n, batch_mean, batch_m2, m):
+    """
+    Chan et al. merge of a batch's moments into running ones.
 
-    # Calculate payoffs for each simulation
-    payoffs = np.maximum(final_prices - K, 0)
+    mean and m2 (the sum of squared deviations from the mean) are updated in
+    place from the n values seen so far and a batch of m values with mean
+    batch_mean and sum of squared deviations batch_m2.
 
-    # Calculate the average payoff
-    average_payoff = np.mean(payoffs)
+    Returns:
+        The merged count n + m.
+    """
+    total = n + m
+    delta = batch_mean - mean
+    m2 += batch_m2 + delta**2 * (n * m / total)
+    mean += delta * (m / total)
+    return total
 
-    # Discount the average payoff back to present value
-    option_price = discount_factor * average_payoff
+def price_option_grid(S0, strikes, maturities, r, sigma, num_simulations, rng=None,
+                      batch_size=2**16, dtype=np.float64):
+    """
+    Prices European calls for every strike and maturity from one set of paths.
 
-    return option_price
+    Each batch of paths is advanced from maturity to maturity (GBM can be
+    sampled exactly at any time, so no intermediate steps are needed); at each
+    maturity the discounted payoffs of all strikes are evaluated at once by
+    broadcasting the terminal prices against the strikes. Running means and
+    variances are merged batch by batch, so memory is O(batch_size * len(strikes)).
+
+    Args:
+        S0, r, sigma: Initial price, risk-free rate and volatility.
+        strikes: Array of strike prices.
+        maturities: Array of maturities, in any order.
+        num_simulations: Number of paths shared by all contracts.
+        rng: Optional numpy Generator to draw from. Defaults to the global
+            np.random state.
+        batch_size: Number of paths simulated at once.
+        dtype: Floating point type of the path state.
+
+    Returns:
+        Prices and standard errors, each of shape (len(maturities), len(strikes)).
+    """
+    rng = np.random if rng is None else rng
+    strikes = np.asarray(strikes, dtype=float)
+    maturities = np.asarray(maturities, dtype=float)
+    order = np.argsort(maturities)
+    steps = np.diff(maturities[order], prepend=0.0)
+    discount_factors = np.exp(-r * maturities[order])[:, None]
+
+    shape = (maturities.size, strikes.size)
+    mean = np.zeros(shape)
+    m2 = np.zeros(shape) # Sum of squared deviations from the mean
+    n = 0
+    while n < num_simulations:
+        m = min(batch_size, num_simulations - n)
+        prices = np.full(m, S0, dtype=dtype)
+        batch_mean = np.empty(shape)
+        batch_m2 = np.empty(shape)
+        for j, dt in enumerate(steps):
+            prices *= np.exp((r - 0.5 * sigma**2) * dt
+                             + sigma * np.sqrt(dt) * rng.standard_normal(m)).astype(dtype)
+            payoffs = discount_factors[j] * np.maximum(prices[:, None] - strikes, 0)
+            batch_mean[j] = payoffs.mean(axis=0)
+            batch_m2[j] = ((payoffs - batch_mean[j])**2).sum(axis=0)
+
+        n = merge_moments(mean, m2, n, batch_mean, batch_m2, m)
+
+    std_errors = np.sqrt(m2 / max(n - 1, 1) / n)
+    # Undo the sorting of the maturities
+    inverse = np.argsort(order)
+    return mean[inverse], std_errors[inverse]
 
 def black_scholes_call(S, K, T, r, sigma):
-    """Calculates European call option price using Black-Scholes formula."""
-    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * np.sqrt(T))
-    d2 = d1 - sigma * np.sqrt(T)
-    call_price = (S * norm.cdf(d1) - K * np.exp(-r * T) * norm.cdf(d2))
-    return call_price
+    """
+    Calculates European call option price using Black-Scholes formula.
+
+    All arguments broadcast against each other, so e.g.
+    black_scholes_call(S0, strikes[None, :], maturities[:, None], r, sigma)
+    returns the whole (maturity x strike) price surface. Without uncertainty
+    (T = 0 or sigma = 0) the price is the discounted forward intrinsic value
+    max(S - K exp(-rT), 0), which at T = 0 is max(S - K, 0).
+    """
+    S, K, T = np.asarray(S, dtype=float), np.asarray(K, dtype=float), np.asarray(T, dtype=float)
+    sigma = np.asarray(sigma, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * np.sqrt(T))
+        d2 = d1 - sigma * np.sqrt(T)
+        call_price = (S * norm.cdf(d1) - K * np.exp(-r * T) * norm.cdf(d2))
+    call_price = np.where(sigma * np.sqrt(T) > 0, call_price,
+                          np.maximum(S - K * np.exp(-r * T), 0))
+    return call_price[()] # A scalar for scalar inputs
 
-# --- Removed example parameters and simulation execution ---
\ No newline at end of file
+# --- Removed example parameters and simulation execution ---
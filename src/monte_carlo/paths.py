@@ -0,0 +1,76 @@
+from collections import namedtuple
+import numpy as np
+
+# Path engine for geometric Brownian motion. Paths are advanced one time step
+# at a time with in-place updates, keeping only the statistics a payoff needs
+# (terminal price, running average, running maximum / minimum), so memory is
+# O(num_simulations) however many steps there are: 10^6 paths x 252 steps
+# need a few arrays of 8 MB instead of two 2 GB matrices.
+
+PathStatistics = namedtuple('PathStatistics', ['terminal', 'average', 'maximum', 'minimum'])
+PathStatistics.__doc__ = """
+Per-path statistics of simulated price paths, each an array of shape (num_simulations,).
+
+Fields:
+    terminal: Price at T.
+    average: Arithmetic average of the prices at the num_steps monitoring
+        dates after 0 (None if not tracked).
+    maximum, minimum: Running maximum / minimum over all grid points
+        including S0 (None if not tracked).
+"""
+
+PATH_STATISTICS = ('average', 'maximum', 'minimum')
+
+def simulate_paths(S0, T, r, sigma, num_simulations, num_steps, rng=None, normals=None,
+                   track=PATH_STATISTICS, dtype=np.float64):
+    """
+    Simulates risk-neutral GBM paths step by step and returns their statistics.
+
+    Each step updates the prices in place,
+    S(t + dt) = S(t) * exp((r - sigma^2 / 2) dt + sigma sqrt(dt) Z).
+
+    Args:
+        S0, T, r, sigma: Initial price, horizon, risk-free rate and volatility.
+        num_simulations: Number of paths.
+        num_steps: Number of equally spaced time steps.
+        rng: Optional numpy Generator to draw from. Defaults to the global
+            np.random state. Step t uses the next num_simulations normals, so
+            the paths equal those driven by a (num_steps, num_simulations)
+            matrix of normals drawn at once.
+        normals: Optional iterable yielding the num_steps arrays of standard
+            normals (num_simulations,) to use instead of drawing from rng.
+        track: Which of 'average', 'maximum' and 'minimum' to accumulate.
+        dtype: Floating point type of the path state, e.g. np.float32 to halve
+            memory and bandwidth.
+
+    Returns:
+        A PathStatistics namedtuple.
+    """
+    rng = np.random if rng is None else rng
+    if normals is None:
+        normals = (rng.standard_normal(num_simulations) for _ in range(num_steps))
+    dt = T / num_steps
+    drift = (r - 0.5 * sigma**2) * dt
+    vol = sigma * np.sqrt(dt)
+
+    prices = np.full(num_simulations, S0, dtype=dtype)
+    average = np.zeros(num_simulations, dtype=dtype) if 'average' in track else None
+    maximum = prices.copy() if 'maximum' in track else None
+    minimum = prices.copy() if 'minimum' in track else None
+    growth = np.empty(num_simulations, dtype=dtype) # Scratch buffer, reused every step
+
+    for z in normals:
+        np.multiply(z, vol, out=growth, casting='same_kind')
+        growth += drift
+        np.exp(growth, out=growth)
+        prices *= growth
+        if average is not None:
+            average += prices
+        if maximum is not None:
+            np.maximum(maximum, prices, out=maximum)
+        if minimum is not None:
+            np.minimum(minimum, prices, out=minimum)
+
+    if average is not None:
+        average /= num_steps
+    return PathStatistics(prices, average, maximum, minimum)
@@ -1,23 +1,63 @@
-import random
-import math
+import time
+import numpy as np
+from .results import MonteCarloResult
+from ..parallel import run_parallel
 
-def estimate_pi(num_points):
-    """Estimates pi using the Monte Carlo method."""
+def _count_inside(num_points, chunk_size, rng=None):
+    """Counts random points of the unit square inside the quarter circle, chunk by chunk."""
+    rng = np.random if rng is None else rng
     points_inside_circle = 0
-    total_points = num_points
-
-    for _ in range(num_points):
+    for start in range(0, num_points, chunk_size):
+        m = min(chunk_size, num_points - start)
         # Generate random x, y coordinates between 0 and 1
-        x = random.uniform(0, 1)
-        y = random.uniform(0, 1)
-
+        x = rng.random(m)
+        y = rng.random(m)
         # Check if the point is inside the quarter circle (distance from origin <= 1)
         # Using x^2 + y^2 <= 1^2 is equivalent and avoids sqrt
-        if x**2 + y**2 <= 1:
-            points_inside_circle += 1
+        points_inside_circle += int(np.count_nonzero(x * x + y * y <= 1))
+    return points_inside_circle
+
+def estimate_pi(num_points, rng=None, chunk_size=2**20, n_workers=None, seed=None,
+                full_output=False):
+    """
+    Estimates pi using the Monte Carlo method.
+
+    Points are generated and tested in chunks of chunk_size, so memory stays
+    flat however many points are used.
+
+    Args:
+        num_points: Number of random points.
+        rng: Optional numpy Generator to draw from. Defaults to the global
+            np.random state.
+        chunk_size: Points generated per vectorized chunk.
+        n_workers: If given, split the points over this many processes, each
+            with its own stream spawned from seed (see src.parallel); rng is
+            then not used.
+        seed: Master seed for n_workers. None draws fresh entropy.
+        full_output: Return a MonteCarloResult with standard error and timing
+            instead of the bare estimate.
+
+    Returns:
+        The estimate of pi, or a MonteCarloResult if full_output.
+    """
+    start_time = time.perf_counter()
+    if n_workers is None:
+        points_inside_circle = _count_inside(num_points, chunk_size, rng)
+    else:
+        sizes = [num_points // n_workers + (i < num_points % n_workers) for i in range(n_workers)]
+        counts = run_parallel(_count_inside, seed, n_workers,
+                              task_kwargs=[{'num_points': size, 'chunk_size': chunk_size}
+                                           for size in sizes])
+        points_inside_circle = sum(counts)
+    elapsed = time.perf_counter() - start_time
 
     # Calculate the estimate for pi
-    pi_estimate = 4 * (points_inside_circle / total_points)
-    return pi_estimate
+    fraction_inside = points_inside_circle / num_points
+    pi_estimate = 4 * fraction_inside
+    if not full_output:
+        return pi_estimate
+    # Binomial standard error of the fraction, scaled by 4
+    std_error = 4 * np.sqrt(fraction_inside * (1 - fraction_inside) / num_points)
+    return MonteCarloResult(pi_estimate, float(std_error), num_points, elapsed)
 
-# --- Removed simulation execution code ---
\ No newline at end of file
+# --- Removed simulation execution code ---
@@ -0,0 +1,128 @@
+import warnings
+import numpy as np
+from scipy.special import ndtri
+from scipy.stats import qmc
+
+# Point-set backends for the Monte Carlo estimators. A point set draws points
+# in the unit hypercube [0, 1)^d: either independent pseudo-random points, or
+# scrambled low-discrepancy (quasi-Monte Carlo) sequences, whose error for
+# smooth integrands shrinks close to O(1/N) instead of O(1/sqrt(N)).
+# Every scrambling is an independent randomization, so repeating an estimate
+# over a few independently scrambled replicates gives an error bar
+# (randomized QMC).
+
+POINT_SETS = ('pseudo', 'sobol', 'halton')
+
+def make_point_set(kind, d, rng=None):
+    """
+    Creates a point set in [0, 1)^d.
+
+    Args:
+        kind: 'pseudo', 'sobol' (scrambled Sobol') or 'halton' (scrambled
+            Halton). A callable kind(d, rng) returning a draw function plugs in
+            any other backend.
+        d: Dimension of the points.
+        rng: Optional numpy Generator driving the draws or the scrambling.
+            Defaults to the global np.random state.
+
+    Returns:
+        A function draw(n) returning the next n points as an array of shape
+        (n, d). Successive calls continue the same sequence. Sobol' points
+        keep their balance properties when every n is a power of 2.
+    """
+    if callable(kind):
+        return kind(d, rng)
+    if kind not in POINT_SETS:
+        raise ValueError(f"Unknown point set {kind!r}; expected one of {POINT_SETS}.")
+    if kind == 'pseudo':
+        generator = np.random if rng is None else rng
+        return lambda n: generator.random((n, d))
+
+    # scipy needs a seed or Generator; derive one from the global state if no rng is given
+    seed = np.random.randint(2**32) if rng is None or rng is np.random else rng
+    engine_class = qmc.Sobol if kind == 'sobol' else qmc.Halton
+    engine = engine_class(d, scramble=True, seed=seed)
+    return engine.random
+
+def replicate_sizes(kind, num_samples, n_replicates, block_size):
+    """
+    Points per replicate and per draw for randomized (Q)MC with n_replicates replicates.
+
+    Sobol' points keep their balance properties only in power-of-2 draws, so
+    for 'sobol' both sizes are rounded down to powers of 2 (with one warning
+    if that drops points from the budget).
+
+    Returns:
+        (per_replicate, block_size)
+
+    Raises:
+        ValueError: If num_samples < n_replicates.
+    """
+    if n_replicates < 2 or num_samples < n_replicates:
+        raise ValueError(f"Need n_replicates >= 2 and num_samples >= n_replicates; got "
+                         f"num_samples={num_samples}, n_replicates={n_replicates}.")
+    per_replicate = num_samples // n_replicates
+    if kind == 'sobol':
+        rounded = 1 << (per_replicate.bit_length() - 1)
+        if rounded < per_replicate:
+            warnings.warn(f"Sobol' points need power-of-2 sizes; using {rounded} points per "
+                          f"replicate instead of {per_replicate}.")
+        per_replicate = rounded
+        block_size = 1 << (int(block_size).bit_length() - 1)
+    return per_replicate, block_size
+
+def uniform_to_normal(u):
+    """Maps points of [0, 1) to standard normals by the inverse CDF."""
+    # Guard the (measure zero) endpoints, which would map to -inf / inf
+    tiny = np.finfo(float).tiny
+    return ndtri(np.clip(u, tiny, 1.0 - np.finfo(float).epsneg))
+
+def _bridge_schedule(num_steps):
+    """
+    Order in which a Brownian bridge fills in the grid points 1..num_steps.
+
+    Returns a list of (index, left, right) in breadth-first order: first the
+    end point (left = 0, right = None), then the midpoints of ever smaller
+    intervals, each conditioned on its known left and right neighbours.
+    """
+    schedule = [(num_steps, 0, None)]
+    intervals = [(0, num_steps)]
+    while intervals:
+        next_intervals = []
+        for left, right in intervals:
+            if right - left > 1:
+                mid = (left + right) // 2
+                schedule.append((mid, left, right))
+                next_intervals += [(left, mid), (mid, right)]
+        intervals = next_intervals
+    return schedule
+
+def brownian_bridge_increments(z):
+    """
+    Turns standard normals into Brownian increments by Brownian-bridge construction.
+
+    Column 0 of z fixes the end point of the path, column 1 its midpoint,
+    and so on, so the most important directions of the path go to the first
+    (best distributed) QMC coordinates. The result has the same distribution
+    as z itself when z is i.i.d. normal.
+
+    Args:
+        z: Standard normals of shape (n, num_steps).
+
+    Returns:
+        Standard normal increments of shape (n, num_steps) in time order, i.e.
+        (W(t_k) - W(t_{k-1})) / sqrt(dt) on an equally spaced grid.
+    """
+    n, num_steps = z.shape
+    # Brownian motion on the grid in units of dt: W[:, k] at time k
+    W = np.zeros((n, num_steps + 1))
+    for column, (index, left, right) in enumerate(_bridge_schedule(num_steps)):
+        if right is None:
+            W[:, index] = np.sqrt(index) * z[:, column]
+            continue
+        # W(mid) given W(left), W(right) is normal with linearly interpolated mean
+        span = right - left
+        mean = ((right - index) * W[:, left] + (index - left) * W[:, right]) / span
+        sd = np.sqrt((index - left) * (right - index) / span)
+        W[:, index] = mean + sd * z[:, column]
+    return np.diff(W, axis=1)
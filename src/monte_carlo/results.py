@@ -0,0 +1,22 @@
+from collections import namedtuple
+
+class MonteCarloResult(namedtuple('MonteCarloResult',
+                                  ['estimate', 'std_error', 'num_samples', 'elapsed',
+                                   'variance_reduction'], defaults=(1.0,))):
+    """
+    Result of a Monte Carlo estimator called with full_output=True.
+
+    Fields:
+        estimate: The Monte Carlo estimate.
+        std_error: Its standard error.
+        num_samples: Number of samples (points, function evaluations or paths) used.
+        elapsed: Wall-clock time in seconds.
+        variance_reduction: Variance of plain Monte Carlo with the same number
+            of samples divided by the achieved variance (1.0 for plain sampling).
+    """
+    __slots__ = ()
+
+    @property
+    def throughput(self):
+        """Samples per second."""
+        return self.num_samples / self.elapsed if self.elapsed > 0 else float('inf')
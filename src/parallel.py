@@ -0,0 +1,95 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# Every function in src/mcmc and src/monte_carlo accepts an `rng` keyword
+# (a numpy Generator). The helpers below give each worker process its own
+# stream spawned from one master SeedSequence, so results depend only on the
+# master seed and the number of workers, never on scheduling.
+
+def spawn_generators(seed, n_streams):
+    """Returns n_streams independent numpy Generators spawned from one master seed."""
+    children = np.random.SeedSequence(seed).spawn(n_streams)
+    return [np.random.default_rng(child) for child in children]
+
+def _call_with_stream(func, seed_sequence, args, kwargs):
+    """Worker entry point: builds the worker's Generator and runs func with it."""
+    return func(*args, rng=np.random.default_rng(seed_sequence), **kwargs)
+
+def run_parallel(func, seed, n_workers, args=(), task_kwargs=None, max_workers=None):
+    """
+    Runs func once per worker in a process pool, each with its own random stream.
+
+    Args:
+        func: Picklable (module-level) function accepting an `rng` keyword.
+        seed: Master seed. Worker i always gets the i-th spawned child stream.
+        n_workers: Number of tasks, and of independent streams.
+        args: Positional arguments shared by all tasks.
+        task_kwargs: Optional list of n_workers keyword dicts, one per task.
+        max_workers: Process count for the pool (defaults to n_workers).
+
+    Returns:
+        A list with the n_workers results, in task order.
+    """
+    if task_kwargs is None:
+        task_kwargs = [{}] * n_workers
+    children = np.random.SeedSequence(seed).spawn(n_workers)
+    with ProcessPoolExecutor(max_workers=max_workers or n_workers) as executor:
+        futures = [executor.submit(_call_with_stream, func, child, args, kwargs)
+                   for child, kwargs in zip(children, task_kwargs)]
+        return [future.result() for future in futures]
+
+def parallel_chains(sampler, *args, n_workers, seed, chains_per_worker=None, max_workers=None,
+                    **kwargs):
+    """
+    Runs MCMC chains across processes and stacks them as one multi-chain result.
+
+    Args:
+        sampler: metropolis_sampler, gibbs_sampler_bivariate_normal or any
+            sampler with the same n_chains/rng keywords.
+        *args, **kwargs: Passed on to the sampler.
+        n_workers: Number of worker tasks (and random streams).
+        seed: Master seed.
+        chains_per_worker: If given, each worker runs this many vectorized
+            chains (n_chains); otherwise each worker runs a single chain.
+        max_workers: Process count for the pool (defaults to n_workers).
+
+    Returns:
+        What the sampler returns in multi-chain mode, with the chains of all
+        workers concatenated along the first axis.
+    """
+    if chains_per_worker is not None:
+        kwargs['n_chains'] = chains_per_worker
+    results = run_parallel(sampler, seed, n_workers, args=args,
+                           task_kwargs=[kwargs] * n_workers, max_workers=max_workers)
+
+    merge = np.concatenate if chains_per_worker is not None else np.stack
+    if isinstance(results[0], tuple):
+        # e.g. (samples, acceptance_rate)
+        return tuple(merge([np.asarray(part) for part in parts]) for parts in zip(*results))
+    return merge(results)
+
+def parallel_estimate(estimator, *args, size_arg, total, n_workers, seed, max_workers=None,
+                      **kwargs):
+    """
+    Splits one Monte Carlo estimate into batches computed in separate processes.
+
+    Args:
+        estimator: estimate_pi, estimate_integral, monte_carlo_option_price or
+            any estimator returning a sample mean and accepting `rng`.
+        *args, **kwargs: Passed on to the estimator.
+        size_arg: Name of the estimator's sample-count parameter, e.g.
+            'num_points', 'num_samples' or 'num_simulations'.
+        total: Total number of samples over all batches.
+        n_workers: Number of batches (and random streams).
+        seed: Master seed.
+        max_workers: Process count for the pool (defaults to n_workers).
+
+    Returns:
+        The sample-size weighted mean of the batch estimates, which equals the
+        estimate from all samples pooled.
+    """
+    sizes = [total // n_workers + (i < total % n_workers) for i in range(n_workers)]
+    task_kwargs = [dict(kwargs, **{size_arg: size}) for size in sizes]
+    estimates = run_parallel(estimator, seed, n_workers, args=args, task_kwargs=task_kwargs,
+                             max_workers=max_workers)
+    return float(np.dot(sizes, estimates) / total)
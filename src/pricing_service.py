@@ -0,0 +1,403 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .monte_carlo.option_pricing import (PAYOFFS, PAYOFF_STATISTICS, black_scholes_call,
+                                         call_payoffs, merge_moments, price_option_grid)
+from .monte_carlo.paths import simulate_paths
+
+# Local asyncio pricing service. Clients send one JSON object per line over
+# TCP, e.g.
+#   {"id": 1, "method": "monte_carlo", "params": {"S0": 100, "K": 105, "T": 1,
+#    "r": 0.05, "sigma": 0.2, "num_simulations": 100000}}
+# and get back {"id": 1, "price": ..., "std_error": ...} (or {"id": 1,
+# "error": ...}). Requests arriving within batch_window seconds of each other
+# are coalesced: Black-Scholes prices are evaluated in one vectorized call,
+# and Monte Carlo requests on the same underlying share one set of simulated
+# paths, run in a process pool so the event loop is never blocked by a
+# simulation. {"method": "stats"} returns request counts and latency
+# percentiles. Start it with
+#   python -m src.pricing_service --port 8765
+
+METHODS = ('monte_carlo', 'black_scholes', 'stats')
+
+# Defaults of the optional Monte Carlo request parameters
+DEFAULT_PARAMS = {'num_simulations': 10**5, 'num_steps': 100, 'payoff': 'european',
+                  'barrier': None}
+
+_REQUIRED = ('S0', 'K', 'T', 'r', 'sigma')
+
+def _contract(method, params):
+    """Validated, defaults-filled parameters of one pricing request."""
+    missing = [name for name in _REQUIRED if name not in params]
+    if missing:
+        raise ValueError(f"Missing parameters: {', '.join(missing)}.")
+    unknown = set(params) - set(_REQUIRED) - (set(DEFAULT_PARAMS) if method == 'monte_carlo' else set())
+    if unknown:
+        raise ValueError(f"Unknown parameters for {method}: {', '.join(sorted(unknown))}.")
+    contract = {name: float(params[name]) for name in _REQUIRED}
+    if contract['S0'] <= 0 or contract['K'] <= 0 or contract['T'] < 0 or contract['sigma'] < 0:
+        raise ValueError("Expected S0 > 0, K > 0, T >= 0 and sigma >= 0.")
+    if method == 'monte_carlo':
+        contract.update({name: params.get(name, default) for name, default in DEFAULT_PARAMS.items()})
+        contract['num_simulations'] = int(contract['num_simulations'])
+        contract['num_steps'] = int(contract['num_steps'])
+        if contract['num_simulations'] < 2 or contract['num_steps'] < 1:
+            raise ValueError("Expected num_simulations >= 2 and num_steps >= 1.")
+        if contract['payoff'] not in PAYOFFS:
+            raise ValueError(f"Unknown payoff {contract['payoff']!r}; expected one of {PAYOFFS}.")
+        if contract['payoff'] in ('up_and_out', 'down_and_out') and contract['barrier'] is None:
+            raise ValueError(f"The {contract['payoff']} payoff needs a barrier.")
+        if contract['barrier'] is not None:
+            contract['barrier'] = float(contract['barrier'])
+    return contract
+
+def _group_key(contract):
+    """Contracts with equal keys are priced from the same paths."""
+    if contract['payoff'] == 'european':
+        # Terminal prices are sampled exactly at any maturity, so only the
+        # underlying and the path count must match
+        return ('european', contract['S0'], contract['r'], contract['sigma'],
+                contract['num_simulations'])
+    # Path-dependent payoffs also share the time grid and the payoff
+    return (contract['payoff'], contract['S0'], contract['r'], contract['sigma'],
+            contract['num_simulations'], contract['T'], contract['num_steps'], contract['barrier'])
+
+def _price_european_group(S0, r, sigma, num_simulations, strikes, maturities, rng, batch_size):
+    """Prices of European calls (strikes[i], maturities[i]) from one set of terminal prices."""
+    unique_strikes, strike_index = np.unique(strikes, return_inverse=True)
+    unique_maturities, maturity_index = np.unique(maturities, return_inverse=True)
+    prices, std_errors = price_option_grid(S0, unique_strikes, unique_maturities, r, sigma,
+                                           num_simulations, rng=rng, batch_size=batch_size)
+    return prices[maturity_index, strike_index], std_errors[maturity_index, strike_index]
+
+def _price_path_group(S0, r, sigma, num_simulations, T, num_steps, barrier, payoff, strikes, rng,
+                      batch_size):
+    """Prices of path-dependent calls differing only in the strike, from one set of paths."""
+    mean = np.zeros(strikes.size)
+    m2 = np.zeros(strikes.size)
+    n = 0
+    while n < num_simulations:
+        m = min(batch_size, num_simulations - n)
+        stats = simulate_paths(S0, T, r, sigma, m, num_steps, rng=rng,
+                               track=PAYOFF_STATISTICS[payoff])
+        # Columns broadcast against the strikes: payoffs of shape (m, n_strikes)
+        stats = type(stats)(*(None if field is None else field[:, None] for field in stats))
+        payoffs = np.exp(-r * T) * np.broadcast_to(call_payoffs(stats, strikes, payoff, barrier),
+                                                   (m, strikes.size))
+        batch_mean = payoffs.mean(axis=0)
+        n = merge_moments(mean, m2, n, batch_mean, ((payoffs - batch_mean)**2).sum(axis=0), m)
+    return mean, np.sqrt(m2 / (n - 1) / n)
+
+def price_batch(contracts, seed=None, batch_size=2**16):
+    """
+    Prices a batch of Monte Carlo requests, sharing paths between compatible contracts.
+
+    European calls with the same S0, r, sigma and num_simulations are priced
+    from one set of paths, sampled exactly at each of their maturities (so
+    num_steps does not matter for them). Path-dependent calls share paths when
+    they differ only in the strike. The contracts of a group are therefore
+    correlated, and each is priced from exactly num_simulations paths. An
+    error in one group is reported for its contracts only.
+
+    Args:
+        contracts: List of dicts with S0, K, T, r, sigma, num_simulations,
+            num_steps, payoff and barrier.
+        seed: Seed (or SeedSequence) of the random stream of the batch.
+        batch_size: Maximum number of paths simulated at once.
+
+    Returns:
+        A list with, for each contract in order, its (price, std_error) or the
+        exception raised while pricing its group.
+    """
+    rng = np.random.default_rng(seed)
+    results = [None] * len(contracts)
+    groups = {}
+    for i, contract in enumerate(contracts):
+        try:
+            groups.setdefault(_group_key(contract), []).append(i)
+        except TypeError as error: # Unhashable parameter
+            results[i] = error
+
+    for key, members in groups.items():
+        first = contracts[members[0]]
+        try:
+            strikes = np.array([contracts[i]['K'] for i in members], dtype=float)
+            if key[0] == 'european':
+                maturities = np.array([contracts[i]['T'] for i in members], dtype=float)
+                prices, std_errors = _price_european_group(
+                    first['S0'], first['r'], first['sigma'], first['num_simulations'], strikes,
+                    maturities, rng, batch_size)
+            else:
+                prices, std_errors = _price_path_group(
+                    first['S0'], first['r'], first['sigma'], first['num_simulations'], first['T'],
+                    first['num_steps'], first['barrier'], first['payoff'], strikes, rng,
+                    batch_size)
+        except Exception as error:
+            for i in members:
+                results[i] = error
+            continue
+        for i, price, std_error in zip(members, prices, std_errors):
+            results[i] = (float(price), float(std_error))
+    return results
+
+class PricingService:
+    """
+    Micro-batching pricing service on an asyncio event loop.
+
+    Requests are queued, and batch_window seconds after the first queued
+    request (or as soon as max_batch requests are waiting) the queue is
+    flushed as one batch. Monte Carlo batches run through price_batch in the
+    executor; several batches may be in flight at once. Latencies are
+    measured from arrival to reply, over the last latency_window requests.
+
+    Args:
+        host, port: Address to listen on (port 0 picks a free port).
+        batch_window: Seconds to wait for more requests before flushing.
+        max_batch: Queue length that triggers an immediate flush.
+        executor: concurrent.futures executor for the simulations. Defaults
+            to a ProcessPoolExecutor with max_workers processes, shut down
+            by stop().
+        max_workers: Process count of the default executor.
+        seed: Master seed; batch i uses the i-th spawned child stream.
+        batch_size: Maximum number of paths simulated at once.
+        latency_window: Number of recent latencies kept for the percentiles.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, batch_window=0.002, max_batch=256, executor=None,
+                 max_workers=None, seed=None, batch_size=2**16, latency_window=10000):
+        self.host = host
+        self.port = port
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.batch_size = batch_size
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._max_workers = max_workers
+        self._seed_sequence = np.random.SeedSequence(seed)
+        self._latencies = deque(maxlen=latency_window)
+        self._pending = [] # (method, contract, future, arrival time)
+        self._flush_handle = None
+        self._tasks = set() # Monte Carlo batches in flight
+        self._connections = set() # Connection handler tasks
+        self._server = None
+        self._counts = {'requests': 0, 'errors': 0, 'batches': 0, 'monte_carlo_batches': 0,
+                        'batched': 0}
+
+    async def start(self):
+        """Starts listening; returns the (host, port) actually bound."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self._max_workers)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.host, self.port = self._server.sockets[0].getsockname()[:2]
+        return self.host, self.port
+
+    async def stop(self):
+        """Stops listening, answers the queued requests and shuts the default executor down."""
+        if self._server is not None:
+            self._server.close()
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await asyncio.sleep(0) # Let the connections write their last replies
+        for connection in list(self._connections):
+            connection.cancel()
+        if self._connections:
+            await asyncio.gather(*self._connections, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def price(self, method, **params):
+        """
+        Prices one request through the batching queue (what each connection line does).
+
+        Returns:
+            (price, std_error) for 'monte_carlo', the price for 'black_scholes'.
+        """
+        arrival = time.perf_counter()
+        self._counts['requests'] += 1
+        try:
+            if method not in ('monte_carlo', 'black_scholes'):
+                raise ValueError(f"Unknown method {method!r}; expected one of {METHODS}.")
+            contract = _contract(method, params)
+        except (TypeError, ValueError):
+            self._counts['errors'] += 1
+            raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((method, contract, future, arrival))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_window,
+                                                                       self._flush)
+        return await future
+
+    def latency_percentiles(self, percentiles=(50, 90, 99, 99.9)):
+        """Latency percentiles in seconds over the recent requests, keyed 'p50', 'p99', ..."""
+        if not self._latencies:
+            return {}
+        values = np.percentile(np.array(self._latencies), percentiles)
+        return {f"p{p:g}": float(value) for p, value in zip(percentiles, values)}
+
+    @property
+    def stats(self):
+        """Request, error and batch counts with the latency percentiles."""
+        stats = dict(self._counts, latency=self.latency_percentiles())
+        stats['mean_batch_size'] = stats.pop('batched') / max(stats['batches'], 1)
+        return stats
+
+    def _flush(self):
+        """Takes the queued requests as one batch."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self._counts['batches'] += 1
+        self._counts['batched'] += len(batch)
+
+        # Black-Scholes is cheap enough to evaluate on the loop, in one vectorized call
+        analytic = [entry for entry in batch if entry[0] == 'black_scholes']
+        if analytic:
+            arrays = [np.array([entry[1][name] for entry in analytic]) for name in _REQUIRED]
+            prices = np.atleast_1d(black_scholes_call(*arrays))
+            for (_, _, future, arrival), price in zip(analytic, prices):
+                self._reply(future, arrival, float(price))
+
+        simulated = [entry for entry in batch if entry[0] == 'monte_carlo']
+        if simulated:
+            task = asyncio.ensure_future(self._simulate(simulated))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _simulate(self, batch):
+        self._counts['monte_carlo_batches'] += 1
+        seed = self._seed_sequence.spawn(1)[0]
+        contracts = [contract for _, contract, _, _ in batch]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self._executor, price_batch, contracts, seed, self.batch_size)
+        except Exception as error:
+            self._counts['errors'] += len(batch)
+            for _, _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, _, future, arrival), result in zip(batch, results):
+            if isinstance(result, Exception):
+                self._counts['errors'] += 1
+                if not future.done():
+                    future.set_exception(result)
+            else:
+                self._reply(future, arrival, result)
+
+    def _reply(self, future, arrival, result):
+        self._latencies.append(time.perf_counter() - arrival)
+        if not future.done(): # The client may have gone away
+            future.set_result(result)
+
+    async def _handle_connection(self, reader, writer):
+        """Reads JSON requests line by line; replies, possibly out of order, as they complete."""
+        replies = set()
+        connection = asyncio.current_task()
+        self._connections.add(connection)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                reply = asyncio.ensure_future(self._answer(line, writer))
+                replies.add(reply)
+                reply.add_done_callback(replies.discard)
+            if replies:
+                await asyncio.gather(*replies)
+        except (ConnectionError, asyncio.CancelledError):
+            pass # Client gone, or the service is stopping
+        finally:
+            self._connections.discard(connection)
+            writer.close()
+
+    async def _answer(self, line, writer):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            method = request.get('method')
+            if method == 'stats':
+                response = {'stats': self.stats}
+            else:
+                result = await self.price(method, **request.get('params', {}))
+                if method == 'monte_carlo':
+                    response = {'price': result[0], 'std_error': result[1]}
+                else:
+                    response = {'price': result}
+        except Exception as error:
+            response = {'error': f"{type(error).__name__}: {error}"}
+        writer.write((json.dumps(dict(response, id=request_id)) + '\n').encode())
+        await writer.drain()
+
+async def request(host, port, requests):
+    """
+    Sends requests (dicts with method, params and optionally id) over one connection.
+
+    Returns:
+        The response dicts, in the order of requests.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for i, payload in enumerate(requests):
+            writer.write((json.dumps(dict(payload, id=i)) + '\n').encode())
+        await writer.drain()
+        responses = [None] * len(requests)
+        for _ in requests:
+            response = json.loads(await reader.readline())
+            responses[response.pop('id')] = response
+        return responses
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve option prices on localhost.")
+    parser.add_argument('--port', type=int, default=8765, help="Port to listen on.")
+    parser.add_argument('--batch-window', type=float, default=0.002,
+                        help="Seconds to collect requests into one batch (default 0.002).")
+    parser.add_argument('--max-batch', type=int, default=256,
+                        help="Queue length that flushes a batch at once.")
+    parser.add_argument('--workers', type=int, default=None, help="Simulation processes.")
+    parser.add_argument('--seed', type=int, default=None, help="Master seed.")
+    args = parser.parse_args(argv)
+
+    async def serve():
+        service = PricingService(port=args.port, batch_window=args.batch_window,
+                                 max_batch=args.max_batch, max_workers=args.workers,
+                                 seed=args.seed)
+        host, port = await service.start()
+        print(f"Pricing service listening on {host}:{port}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await service.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import pytest
+import sys
+import os
+
+# Add src directory to path to allow importing modules
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from benchmarks.run_benchmarks import run_benchmark, compare_results, BENCHMARKS
+
+def test_run_benchmark_metrics():
+    """A benchmark run reports throughput, memory and the sampler/estimator metrics."""
+    metrics = run_benchmark('metropolis_sampler', 2000, repeats=1)
+    assert metrics['throughput'] > 0 and metrics['peak_memory_mb'] > 0
+    assert 0 < metrics['ess'] <= 2000 * 1.5 and metrics['ess_per_second'] > 0
+
+    metrics = run_benchmark('estimate_integral', 10000, repeats=1)
+    assert metrics['work_normalized_variance'] > 0 and metrics['abs_error'] < 0.05
+    assert set(BENCHMARKS) >= {'estimate_pi', 'monte_carlo_option_price',
+                               'gibbs_sampler_bivariate_normal'}
+
+def test_compare_results_flags_regressions():
+    """Only changes in the bad direction beyond the threshold are regressions."""
+    baseline = {'results': {'a[n=10]': {'throughput': 100.0, 'peak_memory_mb': 10.0},
+                            'b[n=10]': {'ess_per_second': 50.0}}}
+    current = {'results': {'a[n=10]': {'throughput': 85.0, 'peak_memory_mb': 13.0},
+                           'b[n=10]': {'ess_per_second': 80.0},
+                           'c[n=10]': {'throughput': 1.0}}}
+    regressions = compare_results(baseline, current, threshold=0.2)
+    assert [(key, metric) for key, metric, *_ in regressions] == [('a[n=10]', 'peak_memory_mb')]
+    assert regressions[0][4] == pytest.approx(0.3)
+    assert len(compare_results(baseline, current, threshold=0.1)) == 2
@@ -0,0 +1,144 @@
+import functools
+import math
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add src directory to path to allow importing modules
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from src.cache import ResultCache, library_version
+from src.monte_carlo.integral_estimation import estimate_integral
+from src.monte_carlo.option_pricing import monte_carlo_option_price
+
+def test_cache_hits_return_the_computed_result(tmp_path):
+    """Test that a repeated seeded call is served from memory, then from disk in a new cache."""
+    cache = ResultCache(tmp_path)
+    price = cache.call(monte_carlo_option_price, 100, 105, 1.0, 0.05, 0.2, 2000, 10, seed=1)
+    expected = monte_carlo_option_price(100, 105, 1.0, 0.05, 0.2, 2000, 10,
+                                        rng=np.random.default_rng(1))
+    assert price == expected
+    # Same call with keyword arguments and an explicit default
+    assert cache.call(monte_carlo_option_price, 100, 105, 1.0, 0.05, 0.2, num_simulations=2000,
+                      num_steps=10, payoff='european', seed=1) == price
+    assert cache.stats['misses'] == 1 and cache.stats['memory_hits'] == 1
+
+    fresh = ResultCache(tmp_path)
+    assert fresh.call(monte_carlo_option_price, 100, 105, 1.0, 0.05, 0.2, 2000, 10, seed=1) == price
+    assert fresh.stats['disk_hits'] == 1 and fresh.stats['misses'] == 0
+
+def test_cache_key_depends_on_params_seed_function_and_version():
+    """Test that any change to the call gives a different key."""
+    cache = ResultCache()
+    key = cache.key(estimate_integral, lambda x: x**2, 0, 1, 100, seed=1)
+    assert key == cache.key(estimate_integral, lambda x: x**2, 0, 1, 100, seed=1)
+    assert key != cache.key(estimate_integral, lambda x: x**3, 0, 1, 100, seed=1)
+    assert key != cache.key(estimate_integral, lambda x: x**2, 0, 1, 100, seed=2)
+    assert key != cache.key(estimate_integral, lambda x: x**2, 0, 1, 100, seed=1,
+                            point_set='sobol')
+    assert key != ResultCache(version='other').key(estimate_integral, lambda x: x**2, 0, 1, 100,
+                                                   seed=1)
+    assert key != cache.key(estimate_integral, lambda x: x**2, 0, 1, 100.0, seed=1)
+    # Captured values are part of the function
+    integrands = [(lambda x, a=a: a * x) for a in (1.0, 2.0)]
+    scaled = [(lambda a: lambda x: a * x)(a) for a in (1.0, 2.0)]
+    assert (cache.key(estimate_integral, integrands[0], 0, 1, 100, seed=1)
+            != cache.key(estimate_integral, integrands[1], 0, 1, 100, seed=1))
+    assert (cache.key(estimate_integral, scaled[0], 0, 1, 100, seed=1)
+            != cache.key(estimate_integral, scaled[1], 0, 1, 100, seed=1))
+
+def test_cache_eviction_and_invalidation(tmp_path):
+    """Test the size limits of both tiers and explicit invalidation."""
+    def draws(n, rng=None):
+        return rng.standard_normal(n)
+
+    cache = ResultCache(tmp_path, max_memory_bytes=20000, max_disk_bytes=20000)
+    for seed in range(4):
+        cache.call(draws, 1000, seed=seed) # About 8 kB each
+    stats = cache.stats
+    assert stats['memory_bytes'] <= 20000 and stats['disk_bytes'] <= 20000
+    assert stats['memory_entries'] == 2 and stats['evictions'] > 0
+    result = cache.call(draws, 1000, seed=3)
+    assert cache.stats['memory_hits'] == 1 and not result.flags.writeable
+
+    cache.discard(draws, 1000, seed=3)
+    cache.call(draws, 1000, seed=3)
+    assert cache.stats['misses'] == 5
+    cache.invalidate(draws)
+    assert cache.stats['memory_entries'] == 0 and cache.stats['disk_bytes'] == 0
+
+    # Unseeded calls bypass the cache
+    cache.call(draws, 10, rng=np.random.default_rng(0))
+    assert cache.stats['bypassed'] == 1
+
+class _Scaled:
+    def __init__(self, a):
+        self.a = a
+
+    def __call__(self, x):
+        return self.a * x
+
+class _Slotted:
+    __slots__ = ()
+
+    def __call__(self, x):
+        return x
+
+def _scaled(x, a):
+    return a * x
+
+def test_cache_key_fingerprints_callable_objects():
+    """Test that partials, callable instances, bound methods and np.vectorize hash their state."""
+    cache = ResultCache()
+    def key(integrand):
+        return cache.key(estimate_integral, integrand, 0, 1, 100, seed=1)
+    assert key(functools.partial(_scaled, a=1)) != key(functools.partial(_scaled, a=2))
+    assert key(functools.partial(_scaled, a=1)) == key(functools.partial(_scaled, a=1))
+    assert key(_Scaled(1)) != key(_Scaled(5))
+    assert key(_Scaled(1).__call__) != key(_Scaled(5).__call__)
+    assert key(np.vectorize(math.sin)) != key(np.vectorize(math.cos))
+    with pytest.raises(TypeError):
+        key(_Slotted())
+
+def test_cache_disk_layout_is_portable_and_owned(tmp_path):
+    """Test that entry directories avoid '<' / '>' and invalidation leaves other files alone."""
+    def draws(n, rng=None):
+        return rng.standard_normal(n)
+
+    unrelated = tmp_path / 'important_subdir'
+    unrelated.mkdir()
+    (unrelated / 'data.txt').write_text('keep')
+    cache = ResultCache(tmp_path)
+    cache.call(draws, 10, seed=0)
+    cache.call(lambda n, rng=None: rng.random(n), 10, seed=0)
+    names = [name for _, dirs, _ in os.walk(tmp_path) for name in dirs]
+    assert not any(c in name for name in names for c in '<>')
+
+    cache.invalidate()
+    assert (unrelated / 'data.txt').read_text() == 'keep'
+    assert cache.stats['disk_bytes'] == 0
+    assert not any(name.endswith('.pkl') for _, _, files in os.walk(tmp_path) for name in files)
+
+_SCALE = 1.0
+
+def _helper(x):
+    return _SCALE * x
+
+def _integrand(x):
+    return _helper(x) ** 2
+
+def test_cache_key_follows_globals_and_called_functions():
+    """Test that changing a global read by a called function changes the key."""
+    global _SCALE
+    cache = ResultCache()
+    key = cache.key(estimate_integral, _integrand, 0, 1, 100, seed=1)
+    try:
+        _SCALE = 5.0
+        assert key != cache.key(estimate_integral, _integrand, 0, 1, 100, seed=1)
+    finally:
+        _SCALE = 1.0
+    assert key == cache.key(estimate_integral, _integrand, 0, 1, 100, seed=1)
+    # The default version is a digest of the library source
+    assert cache.version == library_version() and len(cache.version) == 64
@@ -1,5 +1,6 @@
 import pytest
 import numpy as np
+import subprocess
 import sys
 import os
 
@@ -7,8 +8,20 @@ import os
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, project_root)
 
-from src.mcmc.gibbs_sampling import gibbs_sampler_bivariate_normal
-from src.mcmc.metropolis_hastings import metropolis_sampler, target_pdf_unnormalized
+from src.mcmc.gibbs_sampling import (
+    gibbs_sampler_bivariate_normal, gibbs_sampler_gaussian, gibbs_gaussian_stream
+)
+from src.mcmc.metropolis_hastings import (
+    metropolis_sampler, metropolis_stream, target_pdf_unnormalized, log_target_unnormalized
+)
+from src.mcmc.diagnostics import (
+    OnlineDiagnostics, StoppingRule, effective_sample_size, split_rhat
+)
+from src.mcmc.gradient_samplers import hmc_sampler, mala_sampler
+from src.mcmc.instrumentation import SamplerMonitor
+from src.mcmc import jit
+from src.mcmc.storage import open_samples
+from src.mcmc.streaming import summarize_stream, QuantileSketch
 
 # --- Tests for Gibbs Sampling ---
 
@@ -39,6 +52,27 @@ def test_gibbs_sampler_mean_covariance():
     assert np.allclose(sample_mean, target_mean, atol=0.1)
     assert np.allclose(sample_cov, target_cov, atol=0.15)
 
+def test_gibbs_sampler_perfect_correlation():
+    """Test that rho = +-1 (singular covariance) samples on the line instead of failing."""
+    samples = gibbs_sampler_bivariate_normal(0, 0, 1, 1, 1.0, 100, 10)
+    assert samples.shape == (90, 2)
+    assert np.allclose(samples[:, 0], samples[:, 1])
+    samples = gibbs_sampler_bivariate_normal(1, 2, 1, 2, -1.0, 100, 10,
+                                             rng=np.random.default_rng(0))
+    assert np.allclose(samples[:, 1] - 2, -2 * (samples[:, 0] - 1))
+
+def test_gibbs_sampler_gaussian_multi_chain():
+    """Test the block engine on a 3D Gaussian with several chains, including the per-step path."""
+    np.random.seed(42)
+    mean = np.array([1.0, -2.0, 0.5])
+    cov = np.array([[2.0, 0.6, 0.3], [0.6, 1.0, -0.4], [0.3, -0.4, 1.5]])
+    for n_chains in (4, 20): # 20 chains * 3 dims takes the per-iteration path
+        samples = gibbs_sampler_gaussian(mean, cov, 10000, 500, n_chains=n_chains, block_size=3000)
+        assert samples.shape == (n_chains, 9500, 3)
+        pooled = samples.reshape(-1, 3)
+        assert np.allclose(np.mean(pooled, axis=0), mean, atol=0.1)
+        assert np.allclose(np.cov(pooled, rowvar=False), cov, atol=0.1)
+
 # --- Tests for Metropolis-Hastings ---
 
 def test_metropolis_sampler_output_shape():
@@ -60,4 +94,360 @@ def test_metropolis_sampler_symmetry():
     # Mean should be close to 0 for this symmetric distribution
     assert abs(sample_mean) < 0.1
 
+def test_metropolis_sampler_multi_chain():
+    """Test the vectorized multi-chain mode returns one row and one acceptance rate per chain."""
+    np.random.seed(42)
+    num_samples = 20000
+    burn_in = 2000
+    n_chains = 8
+    samples, rates = metropolis_sampler(target_pdf_unnormalized, 1.0, num_samples, burn_in, n_chains=n_chains)
+    assert samples.shape == (n_chains, num_samples - burn_in)
+    assert rates.shape == (n_chains,)
+    assert np.all((rates > 0) & (rates < 1))
+    # Pooled mean of the symmetric target should be close to 0
+    assert abs(np.mean(samples)) < 0.05
+
+def test_metropolis_sampler_log_target_evaluations():
+    """Test that a user log target is honored and evaluated once per step (plus the initial state)."""
+    np.random.seed(42)
+    calls = []
+
+    def log_normal(x):
+        calls.append(x)
+        return -0.5 * (x - 3.0)**2
+
+    num_samples = 20000
+    burn_in = 2000
+    samples, _ = metropolis_sampler(None, 2.0, num_samples, burn_in, log_target=log_normal)
+    assert len(calls) == num_samples + 1
+    assert abs(np.mean(samples) - 3.0) < 0.1
+
+def test_metropolis_sampler_batched_log_target():
+    """Test that vectorized and per-chain evaluation of the log target give the same chains."""
+    np.random.seed(0)
+    batched, batched_rates = metropolis_sampler(None, 1.0, 500, 100, n_chains=4,
+                                                log_target=log_target_unnormalized)
+    np.random.seed(0)
+    looped, looped_rates = metropolis_sampler(None, 1.0, 500, 100, n_chains=4,
+                                              log_target=lambda x: -x**4, vectorized=False)
+    assert np.array_equal(batched, looped)
+    assert np.array_equal(batched_rates, looped_rates)
+
+def test_metropolis_sampler_adaptive_scale():
+    """Test that a badly scaled proposal is tuned towards the target acceptance rate."""
+    samples, rate, tuning = metropolis_sampler(None, 20.0, 30000, 5000,
+                                               log_target=log_target_unnormalized, adapt=True,
+                                               rng=np.random.default_rng(0))
+    assert samples.shape == (25000,)
+    assert 0.5 < tuning['proposal_std'] < 5.0
+    assert abs(rate - 0.44) < 0.05
+
+def test_metropolis_sampler_adaptive_covariance():
+    """Test that the proposal covariance adapts to a correlated multivariate target."""
+    rng = np.random.default_rng(1)
+    mean = np.array([1.0, -1.0, 0.0])
+    cov = np.array([[4.0, 1.8, 0.0], [1.8, 1.0, 0.2], [0.0, 0.2, 0.5]])
+    precision = np.linalg.inv(cov)
+
+    def log_normal(x):
+        centered = x - mean
+        return -0.5 * np.einsum('...i,ij,...j->...', centered, precision, centered)
+
+    samples, rates, tuning = metropolis_sampler(None, 1.0, 30000, 10000, n_chains=8, dim=3,
+                                                log_target=log_normal, adapt=True, rng=rng)
+    assert samples.shape == (8, 20000, 3)
+    assert np.all(np.abs(rates - 0.234) < 0.05)
+    assert np.allclose(tuning['proposal_cov'], cov, atol=0.5)
+    pooled = samples.reshape(-1, 3)
+    assert np.allclose(pooled.mean(axis=0), mean, atol=0.15)
+    assert np.allclose(np.cov(pooled, rowvar=False), cov, atol=0.3)
+
+def test_metropolis_sampler_semidefinite_proposal_cov():
+    """Test that a singular proposal covariance (as adaptation can produce) still factorizes."""
+    samples, rates = metropolis_sampler(None, 1.0, 2000, 500, n_chains=2, dim=2,
+                                        log_target=lambda x: -0.5 * np.sum(x**2, axis=-1),
+                                        proposal_cov=np.ones((2, 2)),
+                                        rng=np.random.default_rng(0))
+    assert samples.shape == (2, 1500, 2) and np.all(np.isfinite(samples))
+    assert np.all(rates > 0)
+
+# --- Tests for gradient-based samplers ---
+
+_GAUSS_MEAN = np.linspace(-1.0, 1.0, 10)
+_GAUSS_SD = np.linspace(0.5, 2.0, 10)
+
+def _gauss_log_target(x):
+    return -0.5 * np.sum(((x - _GAUSS_MEAN) / _GAUSS_SD)**2, axis=-1)
+
+def _gauss_grad(x):
+    return -(x - _GAUSS_MEAN) / _GAUSS_SD**2
+
+@pytest.mark.parametrize('sampler, args, target_accept', [
+    (mala_sampler, (0.1,), 0.574),
+    (hmc_sampler, (0.1, 10), 0.65),
+])
+def test_gradient_samplers_adapt_and_recover_moments(sampler, args, target_accept):
+    """Test MALA and HMC on a 10D Gaussian with step-size adaptation across chains."""
+    samples, rates, tuning = sampler(_gauss_log_target, _gauss_grad, np.zeros(10), *args, 4000, 1000,
+                                     n_chains=8, adapt=True, rng=np.random.default_rng(0))
+    assert samples.shape == (8, 3000, 10)
+    assert rates.shape == (8,)
+    assert abs(np.mean(rates) - target_accept) < 0.1
+    assert tuning['step_size'] > 0.1
+    pooled = samples.reshape(-1, 10)
+    assert np.allclose(pooled.mean(axis=0), _GAUSS_MEAN, atol=0.2)
+    assert np.allclose(pooled.std(axis=0) / _GAUSS_SD, 1.0, atol=0.1)
+
+def test_gradient_samplers_single_chain_and_unvectorized():
+    """Test the single-chain contract and per-chain (non-vectorized) evaluation."""
+    samples, rate = hmc_sampler(_gauss_log_target, _gauss_grad, np.zeros(10), 0.3, 5, 600, 100,
+                                rng=np.random.default_rng(1))
+    assert samples.shape == (500, 10)
+    assert 0 < rate <= 1
+
+    kwargs = dict(n_chains=3, rng=None)
+    batched, _ = mala_sampler(_gauss_log_target, _gauss_grad, np.zeros(10), 0.5, 300, 0,
+                              **dict(kwargs, rng=np.random.default_rng(2)))
+    looped, _ = mala_sampler(_gauss_log_target, _gauss_grad, np.zeros(10), 0.5, 300, 0,
+                             vectorized=False, **dict(kwargs, rng=np.random.default_rng(2)))
+    assert np.allclose(batched, looped)
+
+# --- Tests for streaming ---
+
+def test_metropolis_stream_matches_sampler():
+    """Test that the chunked stream yields exactly the thinned samples of metropolis_sampler."""
+    kwargs = dict(log_target=log_target_unnormalized, n_chains=3, thin=4)
+    samples, _ = metropolis_sampler(None, 1.0, 10000, 1000, rng=np.random.default_rng(5), **kwargs)
+    chunks = list(metropolis_stream(None, 1.0, 10000, 1000, chunk_size=300,
+                                    rng=np.random.default_rng(5), **kwargs))
+    assert samples.shape == (3, 2250)
+    assert [chunk.shape[1] for chunk in chunks] == [300] * 7 + [150]
+    assert np.array_equal(np.concatenate(chunks, axis=1), samples)
+
+def test_gibbs_stream_matches_sampler():
+    """Test that the Gibbs stream yields the same thinned samples as the in-memory sampler."""
+    mean, cov = np.array([0.0, 1.0]), np.array([[1.0, 0.5], [0.5, 2.0]])
+    samples = gibbs_sampler_gaussian(mean, cov, 5000, 500, thin=3, block_size=700,
+                                     rng=np.random.default_rng(2))
+    chunks = list(gibbs_gaussian_stream(mean, cov, 5000, 500, chunk_size=400, thin=3,
+                                        block_size=700, rng=np.random.default_rng(2)))
+    assert samples.shape == (1500, 2)
+    assert np.allclose(np.concatenate(chunks), samples)
+
+def test_stream_summary_moments_and_quantiles():
+    """Test the reducer against the exact statistics of a Gibbs stream."""
+    mean = np.array([1.0, -1.0])
+    cov = np.array([[1.0, 0.8], [0.8, 1.0]])
+    stream = gibbs_gaussian_stream(mean, cov, 200000, 1000, chunk_size=5000, n_chains=4,
+                                   rng=np.random.default_rng(0))
+    summary = summarize_stream(stream, dim=2, quantiles=(0.05, 0.5, 0.95))
+    assert summary.n == 4 * 199000
+    assert np.allclose(summary.mean, mean, atol=0.02)
+    assert np.allclose(summary.covariance, cov, atol=0.02)
+    expected = mean + np.outer([-1.6449, 0.0, 1.6449], np.ones(2))
+    assert np.allclose(summary.quantiles(), expected, atol=0.03)
+
+def test_quantile_sketch_bounded_memory():
+    """Test that the sketch stays small and accurate on a long stream."""
+    rng = np.random.default_rng(1)
+    values = rng.uniform(0, 1, 10**6)
+    sketch = QuantileSketch(size=512)
+    for chunk in np.split(values, 100):
+        sketch.update(chunk)
+    assert sum(level.size for level in sketch._levels) < 512 * 12
+    assert np.allclose(sketch.quantile([0.01, 0.5, 0.99]), [0.01, 0.5, 0.99], atol=0.01)
+
+# --- Tests for on-disk sample stores ---
+
+def test_metropolis_store_resumes_after_crash(tmp_path):
+    """Test that a crashed run keeps its completed chunks and resumes to the same chain."""
+    calls = []
+
+    def crashing_log_target(x):
+        calls.append(x)
+        if len(calls) > 25000:
+            raise RuntimeError("simulated crash")
+        return -x**4
+
+    reference, reference_rate = metropolis_sampler(None, 1.0, 35000, 1000,
+                                                   log_target=log_target_unnormalized,
+                                                   rng=np.random.default_rng(9))
+
+    with pytest.raises(RuntimeError):
+        metropolis_sampler(None, 1.0, 35000, 1000, log_target=crashing_log_target,
+                           rng=np.random.default_rng(9), store=tmp_path / 'chain')
+    partial = open_samples(tmp_path / 'chain')
+    assert isinstance(partial, np.memmap)
+    assert partial.shape == (20000,)
+    assert np.array_equal(partial, reference[:20000])
+
+    # The resumed run restores the stored rng state, whatever the new seed
+    samples, rate = metropolis_sampler(None, 1.0, 35000, 1000, log_target=log_target_unnormalized,
+                                       rng=np.random.default_rng(0), store=tmp_path / 'chain')
+    assert isinstance(samples, np.memmap)
+    assert np.array_equal(samples, reference)
+    assert rate == reference_rate
+
+def test_store_with_default_rng_resumes(tmp_path):
+    """Test a store run on the global np.random state, crashed and resumed."""
+    calls = []
+
+    def crashing_log_target(x):
+        calls.append(x)
+        if len(calls) > 15000:
+            raise RuntimeError("simulated crash")
+        return -x**4
+
+    np.random.seed(5)
+    reference, _ = metropolis_sampler(None, 1.0, 25000, 1000, log_target=log_target_unnormalized)
+    np.random.seed(5)
+    with pytest.raises(RuntimeError):
+        metropolis_sampler(None, 1.0, 25000, 1000, log_target=crashing_log_target,
+                           store=tmp_path / 'chain')
+    np.random.seed(123) # Overridden by the stored state
+    samples, _ = metropolis_sampler(None, 1.0, 25000, 1000, log_target=log_target_unnormalized,
+                                    store=tmp_path / 'chain')
+    assert np.array_equal(samples, reference)
+
+    np.random.seed(6)
+    stored = gibbs_sampler_bivariate_normal(0, 0, 1, 1, 0.8, 3000, 300, store=tmp_path / 'gibbs')
+    assert stored.shape == (2700, 2)
+
+def test_gibbs_store_matches_in_memory(tmp_path):
+    """Test that a multi-chain Gibbs run written to disk equals the in-memory run."""
+    expected = gibbs_sampler_bivariate_normal(0, 0, 1, 1, 0.8, 3000, 300, n_chains=2,
+                                              rng=np.random.default_rng(4))
+    stored = gibbs_sampler_bivariate_normal(0, 0, 1, 1, 0.8, 3000, 300, n_chains=2,
+                                            rng=np.random.default_rng(4), store=tmp_path / 'gibbs')
+    assert stored.shape == (2, 2700, 2)
+    assert np.allclose(stored, expected)
+    with pytest.raises(ValueError):
+        gibbs_sampler_bivariate_normal(0, 0, 1, 1, 0.5, 3000, 300, n_chains=2,
+                                       store=tmp_path / 'gibbs')
+
+# --- Tests for convergence diagnostics ---
+
+def _ar1_chains(phi, n_chains, n, seed):
+    """AR(1) chains with unit innovations; their ESS is n_chains * n * (1 - phi) / (1 + phi)."""
+    rng = np.random.default_rng(seed)
+    z = rng.standard_normal((n_chains, n))
+    chains = np.empty_like(z)
+    chains[:, 0] = z[:, 0] / np.sqrt(1 - phi**2)
+    for t in range(1, n):
+        chains[:, t] = phi * chains[:, t - 1] + z[:, t]
+    return chains
+
+def test_ess_and_rhat_on_known_chains():
+    """Test ESS against the exact AR(1) value and that R-hat flags chains stuck apart."""
+    chains = _ar1_chains(0.8, 4, 50000, seed=0)
+    exact_ess = 4 * 50000 * 0.2 / 1.8
+    assert abs(effective_sample_size(chains) / exact_ess - 1) < 0.1
+    assert split_rhat(chains) < 1.01
+    shifted = chains + np.arange(4)[:, None]
+    assert split_rhat(shifted) > 1.1
+
+def test_online_diagnostics_match_offline():
+    """Test that the chunked diagnostics equal the offline ones, and stay close once batched."""
+    chains = _ar1_chains(0.8, 4, 50000, seed=1)
+    exact = OnlineDiagnostics(4, max_batches=10**6)
+    batched = OnlineDiagnostics(4, max_batches=1024)
+    for chunk in np.array_split(chains, 37, axis=1):
+        exact.update(chunk)
+        batched.update(chunk)
+    assert np.isclose(exact.ess(), effective_sample_size(chains))
+    assert np.isclose(exact.rhat(), split_rhat(chains))
+    assert batched.batch_size > 1
+    assert abs(batched.ess() / exact.ess() - 1) < 0.15
+    assert batched.rhat() < 1.01
+
+def test_samplers_stop_early_on_convergence():
+    """Test that a stopping rule ends the run well before a huge num_samples budget."""
+    rule = StoppingRule(min_ess=2000, max_rhat=1.01, check_every=500)
+    samples, rates = metropolis_sampler(None, 1.0, 10**12, 1000, n_chains=4,
+                                        log_target=log_target_unnormalized, stop_rule=rule,
+                                        rng=np.random.default_rng(0))
+    assert samples.shape[1] < 100000
+    assert samples.shape[1] % 500 == 0
+    assert effective_sample_size(samples) >= 1500
+    assert np.all((rates > 0) & (rates < 1))
+
+    samples = gibbs_sampler_bivariate_normal(0, 0, 1, 1, 0.8, 10**12, 1000, n_chains=4,
+                                             stop_rule=rule, rng=np.random.default_rng(0))
+    assert samples.shape[1] < 100000
+    assert np.min(effective_sample_size(samples)) >= 1500
+
+def test_monitor_callbacks_and_counters():
+    """A monitor reports every N iterations and counts draws without changing the samples."""
+    events = []
+    monitor = SamplerMonitor(events.append, every=1000)
+    samples, rate = metropolis_sampler(None, 1.0, 5500, 500, log_target=log_target_unnormalized,
+                                       rng=np.random.default_rng(1), monitor=monitor)
+    plain, _ = metropolis_sampler(None, 1.0, 5500, 500, log_target=log_target_unnormalized,
+                                  rng=np.random.default_rng(1))
+    assert np.array_equal(samples, plain)
+    assert [event.iteration for event in events] == [1000, 2000, 3000, 4000, 5000, 5500]
+    assert events[-1].state == samples[-1]
+    assert all(0 < event.acceptance_rate < 1 and event.seconds_per_iteration > 0 for event in events)
+    assert monitor.accepted[0] == round(rate * 5500)
+    assert monitor.rng_draws == 2 * 5500 and monitor.target_evaluations == 5500 + 1
+
+    events.clear()
+    samples = gibbs_sampler_bivariate_normal(0, 0, 1, 1, 0.5, 3000, 0, n_chains=2,
+                                             rng=np.random.default_rng(2), monitor=monitor)
+    assert [event.iteration for event in events] == [1000, 2000, 3000]
+    assert np.allclose(events[-1].state, samples[:, -1])
+    assert np.all(events[0].acceptance_rate == 1.0)
+    assert monitor.rng_draws == 3000 * 2 * 2 and monitor.target_evaluations == 0
+
+    # A stop rule ending the run early still gets a final event for the last block
+    events.clear()
+    rule = StoppingRule(min_ess=200, max_rhat=1.1, check_every=700)
+    samples, _ = metropolis_sampler(None, 1.0, 10**6, 500, log_target=log_target_unnormalized,
+                                    n_chains=4, rng=np.random.default_rng(3), stop_rule=rule,
+                                    monitor=monitor)
+    assert events[-1].iteration == monitor.iteration == 500 + samples.shape[1] < 10**6
+    events.clear()
+    samples = gibbs_sampler_gaussian(np.zeros(2), np.eye(2), 10**6, 500, n_chains=4,
+                                     rng=np.random.default_rng(3), stop_rule=rule, monitor=monitor)
+    assert events[-1].iteration == monitor.iteration == 500 + samples.shape[1] < 10**6
+
+def test_numba_backend_matches_numpy():
+    """Compiled loops consume the same random stream and give the same chains."""
+    pytest.importorskip("numba")
+    kwargs = dict(rng=np.random.default_rng(3))
+    compiled, rate = metropolis_sampler(target_pdf_unnormalized, 1.0, 20000, 1000, backend='numba',
+                                        **kwargs)
+    plain, plain_rate = metropolis_sampler(target_pdf_unnormalized, 1.0, 20000, 1000,
+                                           rng=np.random.default_rng(3))
+    assert np.array_equal(compiled, plain) and rate == plain_rate
+
+    compiled = gibbs_sampler_bivariate_normal(1, 2, 1, 2, 0.7, 20000, 1000, backend='numba',
+                                              rng=np.random.default_rng(4))
+    plain = gibbs_sampler_bivariate_normal(1, 2, 1, 2, 0.7, 20000, 1000, rng=np.random.default_rng(4))
+    assert np.allclose(compiled, plain)
+
+    # A target numba cannot compile falls back to NumPy with a warning
+    settings = {'scale': 1.0}
+    with pytest.warns(RuntimeWarning, match="Could not compile"):
+        samples, _ = metropolis_sampler(lambda x: settings['scale'] * np.exp(-x * x), 1.0, 1000, 100,
+                                        backend='numba')
+    assert samples.shape == (900,)
+
+def test_backend_falls_back_without_numba(monkeypatch):
+    """Without numba, 'auto' silently and 'numba' with a warning use NumPy."""
+    monkeypatch.setattr(jit, 'numba', None)
+    assert not jit.use_numba('auto')
+    with pytest.warns(RuntimeWarning, match="not installed"):
+        samples, _ = metropolis_sampler(target_pdf_unnormalized, 1.0, 1000, 100, backend='numba')
+    assert samples.shape == (900,)
+    with pytest.raises(ValueError):
+        jit.use_numba('cuda')
+
+def test_numba_is_imported_on_first_use():
+    """Importing the samplers does not import numba; selecting the compiled backend does."""
+    code = ("import sys; import src.mcmc.gibbs_sampling, src.mcmc.metropolis_hastings; "
+            "assert 'numba' not in sys.modules; from src.mcmc import jit; "
+            "assert jit.use_numba('auto') == ('numba' in sys.modules) == jit.NUMBA_AVAILABLE")
+    subprocess.run([sys.executable, '-c', code], cwd=project_root, check=True)
+
 # Add more tests as needed...
@@ -9,7 +9,11 @@ sys.path.insert(0, project_root)
 
 from src.monte_carlo.pi_estimation import estimate_pi
 from src.monte_carlo.integral_estimation import estimate_integral, g
-from src.monte_carlo.option_pricing import monte_carlo_option_price, black_scholes_call
+from src.monte_carlo.option_pricing import monte_carlo_option_price, black_scholes_call, price_option_grid
+from src.monte_carlo.point_sets import make_point_set, brownian_bridge_increments
+from src.monte_carlo.paths import simulate_paths
+from src.monte_carlo.mlmc import mlmc_option_price
+from src.monte_carlo.greeks import black_scholes_greeks, monte_carlo_greeks, GREEKS
 
 # --- Tests for Pi Estimation ---
 
@@ -22,6 +26,24 @@ def test_estimate_pi():
     # Check if the estimate is within a reasonable range of pi
     assert abs(pi_est - np.pi) < 0.05
 
+def test_estimate_pi_full_output():
+    """Test the chunked engine's standard error and that any chunk size estimates pi."""
+    result = estimate_pi(1000003, rng=np.random.default_rng(1), chunk_size=4096, full_output=True)
+    unchunked = estimate_pi(1000003, rng=np.random.default_rng(1), chunk_size=10**7)
+    assert result.num_samples == 1000003
+    assert abs(result.std_error - 4 * np.sqrt(np.pi / 4 * (1 - np.pi / 4) / 1000003)) < 1e-4
+    assert abs(result.estimate - np.pi) < 4 * result.std_error
+    assert result.throughput > 0
+    # x and y come from separate draws per chunk, so only the distribution is chunk independent
+    assert abs(unchunked - np.pi) < 0.01
+
+def test_estimate_pi_parallel_reproducible():
+    """Test that the multi-process mode is reproducible for a master seed."""
+    first = estimate_pi(200000, n_workers=2, seed=11, chunk_size=50000)
+    second = estimate_pi(200000, n_workers=2, seed=11, chunk_size=50000)
+    assert first == second
+    assert abs(first - np.pi) < 0.02
+
 # --- Tests for Integral Estimation ---
 
 def test_estimate_integral():
@@ -33,6 +55,31 @@ def test_estimate_integral():
     exact_integral = 1/3 # Integral of x^2 from 0 to 1
     assert abs(integral_est - exact_integral) < 0.05
 
+def test_estimate_integral_batches_match_single_pass():
+    """Test that batching does not change the estimate or its standard error."""
+    single = estimate_integral(g, 0, 1, 100000, rng=np.random.default_rng(3), full_output=True)
+    batched = estimate_integral(g, 0, 1, 100000, rng=np.random.default_rng(3), batch_size=7000,
+                                full_output=True)
+    assert np.isclose(single.estimate, batched.estimate)
+    assert np.isclose(single.std_error, batched.std_error)
+    assert batched.num_samples == 100000
+    # Var(x^2) for x ~ U(0, 1) is 4/45
+    assert abs(batched.std_error - np.sqrt(4 / 45 / 100000)) < 1e-4
+
+def test_estimate_integral_stops_at_tolerance():
+    """Test precision-targeted stopping on a 3D hyper-rectangle."""
+    a, b = np.array([0.0, 0.0, -1.0]), np.array([1.0, 2.0, 1.0])
+    func = lambda x: np.sum(x**2, axis=1) # Exact integral over the box: 4/3 + 16/3 + 4/3 = 8
+    result = estimate_integral(func, a, b, 10**8, rng=np.random.default_rng(0), batch_size=10000,
+                               rel_tol=1e-3, full_output=True)
+    assert result.num_samples < 10**8
+    assert result.std_error <= 1e-3 * abs(result.estimate)
+    assert abs(result.estimate - 8.0) < 5 * result.std_error
+
+    budget = estimate_integral(func, a, b, 10**9, rng=np.random.default_rng(0), batch_size=10000,
+                               time_budget=0.05, full_output=True)
+    assert budget.num_samples < 10**9
+
 # --- Tests for Option Pricing ---
 
 def test_monte_carlo_option_price():
@@ -52,4 +99,179 @@ def test_monte_carlo_option_price():
     # Allow a larger tolerance due to MC variance
     assert abs(mc_price - bs_price) < 0.5
 
+@pytest.mark.filterwarnings("ignore::UserWarning")
+def test_qmc_integral_beats_pseudo():
+    """Scrambled Sobol'/Halton points give a far smaller error bar on a smooth integrand."""
+    exact = (np.e - 1) ** 3
+    f = lambda x: np.exp(np.sum(x, axis=1))
+    kwargs = dict(n_replicates=8, full_output=True)
+    pseudo = estimate_integral(f, np.zeros(3), np.ones(3), 2**15, rng=np.random.default_rng(0), **kwargs)
+    for point_set in ['sobol', 'halton']:
+        result = estimate_integral(f, np.zeros(3), np.ones(3), 2**15, rng=np.random.default_rng(0),
+                                   point_set=point_set, **kwargs)
+        assert abs(result.estimate - exact) < 5 * result.std_error + 1e-9
+        assert result.std_error < pseudo.std_error / 10
+
+    # Scalar bounds work too
+    assert abs(estimate_integral(g, 0, 1, 2**12, point_set='sobol') - 1/3) < 1e-4
+
+    # Too few points for the replicates, and non-power-of-2 Sobol' sizes (one warning)
+    with pytest.raises(ValueError, match="n_replicates"):
+        estimate_integral(g, 0, 1, 5, point_set='sobol')
+    with pytest.raises(ValueError, match="n_replicates"):
+        monte_carlo_option_price(100, 100, 1.0, 0.05, 0.2, 5, 4, point_set='sobol')
+    with pytest.warns(UserWarning) as record:
+        result = estimate_integral(g, 0, 1, 10000, point_set='sobol', full_output=True)
+    assert len(record) == 1 and result.num_samples == 8 * 1024
+
+def test_brownian_bridge_increments():
+    """The bridge construction maps i.i.d. normals to i.i.d. normal increments."""
+    z = np.random.default_rng(2).standard_normal((200000, 6))
+    increments = brownian_bridge_increments(z)
+    assert np.allclose(np.cov(increments.T), np.eye(6), atol=0.02)
+    # Column 0 of z alone fixes the end point W(T)
+    assert np.allclose(increments.sum(axis=1), np.sqrt(6) * z[:, 0])
+
+def test_qmc_option_price():
+    """RQMC option prices match Black-Scholes within their (small) error bars."""
+    bs_price = black_scholes_call(100, 105, 1.0, 0.05, 0.2)
+    result = monte_carlo_option_price(100, 105, 1.0, 0.05, 0.2, 2**12 * 8, 32,
+                                      rng=np.random.default_rng(3), point_set='sobol',
+                                      full_output=True)
+    assert result.num_samples == 2**15
+    assert abs(result.estimate - bs_price) < max(5 * result.std_error, 0.01)
+    assert result.std_error < 0.02
+
+    with pytest.raises(ValueError):
+        make_point_set('lattice', 2)
+
+def test_option_variance_reduction():
+    """Antithetic, moment-matched and control-variate prices stay unbiased with smaller errors."""
+    bs_price = black_scholes_call(100, 105, 1.0, 0.05, 0.2)
+    plain = monte_carlo_option_price(100, 105, 1.0, 0.05, 0.2, 40000, 10,
+                                     rng=np.random.default_rng(4), full_output=True)
+    assert plain.variance_reduction == 1.0
+    for options in [dict(antithetic=True), dict(moment_matching=True),
+                    dict(control_variate='terminal'),
+                    dict(antithetic=True, control_variate='terminal')]:
+        result = monte_carlo_option_price(100, 105, 1.0, 0.05, 0.2, 40000, 10,
+                                          rng=np.random.default_rng(4), full_output=True, **options)
+        assert result.variance_reduction > 1.2
+        assert result.std_error < plain.std_error
+        assert abs(result.estimate - bs_price) < 5 * result.std_error
+
+    # The Black-Scholes control helps a payoff close to, but not equal to, the European one
+    up_and_out = dict(payoff='up_and_out', barrier=200)
+    plain = monte_carlo_option_price(100, 105, 1.0, 0.05, 0.2, 40000, 10, **up_and_out,
+                                     rng=np.random.default_rng(4), full_output=True)
+    controlled = monte_carlo_option_price(100, 105, 1.0, 0.05, 0.2, 40000, 10, **up_and_out,
+                                          rng=np.random.default_rng(4), full_output=True,
+                                          control_variate='black_scholes')
+    assert 1.2 < controlled.variance_reduction < 1e6
+    assert abs(controlled.estimate - plain.estimate) < 5 * plain.std_error
+
+    # For a European call it is the payoff itself, and moment matching needs paths per group
+    with pytest.raises(ValueError, match="European payoff"):
+        monte_carlo_option_price(100, 105, 1.0, 0.05, 0.2, 1000, 10, control_variate='black_scholes')
+    with pytest.raises(ValueError, match="at least 32 paths"):
+        monte_carlo_option_price(100, 105, 1.0, 0.05, 0.2, 20, 10, moment_matching=True)
+
+    with pytest.raises(ValueError):
+        monte_carlo_option_price(100, 105, 1.0, 0.05, 0.2, 1000, 10, control_variate='strike')
+
+def test_simulate_paths_statistics():
+    """The step-by-step engine reproduces the statistics of the full price matrix."""
+    S0, T, r, sigma, n, steps = 100, 1.0, 0.05, 0.2, 1000, 25
+    Z = np.random.default_rng(5).standard_normal((steps, n))
+    dt = T / steps
+    S = S0 * np.exp(np.cumsum((r - 0.5 * sigma**2) * dt + sigma * np.sqrt(dt) * Z, axis=0))
+
+    stats = simulate_paths(S0, T, r, sigma, n, steps, rng=np.random.default_rng(5))
+    assert np.allclose(stats.terminal, S[-1])
+    assert np.allclose(stats.average, S.mean(axis=0))
+    assert np.allclose(stats.maximum, np.maximum(S.max(axis=0), S0))
+    assert np.allclose(stats.minimum, np.minimum(S.min(axis=0), S0))
+
+    single = simulate_paths(S0, T, r, sigma, n, steps, rng=np.random.default_rng(5),
+                            track=(), dtype=np.float32)
+    assert single.terminal.dtype == np.float32 and single.average is None
+    assert np.allclose(single.terminal, S[-1], rtol=1e-5)
+
+def test_path_dependent_payoffs():
+    """Asian, barrier and lookback prices are ordered sensibly around the European price."""
+    args = (100, 105, 1.0, 0.05, 0.2, 20000, 50)
+    price = lambda **kw: monte_carlo_option_price(*args, rng=np.random.default_rng(6), **kw)
+    european = price()
+    assert price(payoff='asian') < european
+    assert price(payoff='up_and_out', barrier=130) < european
+    assert price(payoff='down_and_out', barrier=1) == european # Barrier never reached
+    assert price(payoff='lookback') > european
+    assert abs(price(dtype=np.float32) - european) < 1e-3
+
+    custom = price(payoff=lambda stats, K: np.maximum(stats.maximum - K, 0))
+    assert custom > european
+    with pytest.raises(ValueError):
+        price(payoff='up_and_out')
+
+def test_price_option_grid():
+    """One shared simulation prices the whole strike x maturity surface."""
+    strikes = np.array([90.0, 100.0, 110.0])
+    maturities = np.array([1.0, 0.25, 2.0])
+    prices, std_errors = price_option_grid(100, strikes, maturities, 0.05, 0.2, 50000,
+                                           rng=np.random.default_rng(7), batch_size=8192)
+    bs_prices = black_scholes_call(100, strikes[None, :], maturities[:, None], 0.05, 0.2)
+    assert prices.shape == std_errors.shape == (3, 3)
+    assert np.all(np.abs(prices - bs_prices) < 5 * std_errors)
+
+    # The vectorized Black-Scholes formula agrees with scalar calls, also at T = 0
+    assert np.isclose(bs_prices[1, 2], black_scholes_call(100, 110, 0.25, 0.05, 0.2))
+    assert np.allclose(black_scholes_call(100, strikes, 0.0, 0.05, 0.2), [10, 0, 0])
+
+def test_black_scholes_greeks_match_finite_differences():
+    """Analytic Greeks agree with central differences of black_scholes_call."""
+    greeks = black_scholes_greeks(100, 105, 1.0, 0.05, 0.2)
+    price = lambda S=100, T=1.0, r=0.05, sigma=0.2: black_scholes_call(S, 105, T, r, sigma)
+    h = 1e-3
+    assert np.isclose(greeks['delta'], (price(S=100 + h) - price(S=100 - h)) / (2 * h))
+    assert np.isclose(greeks['gamma'], (price(S=100 + h) - 2 * price() + price(S=100 - h)) / h**2,
+                      rtol=1e-4)
+    assert np.isclose(greeks['vega'], (price(sigma=0.2 + h) - price(sigma=0.2 - h)) / (2 * h))
+    assert np.isclose(greeks['rho'], (price(r=0.05 + h) - price(r=0.05 - h)) / (2 * h))
+    assert np.isclose(greeks['theta'], -(price(T=1 + h) - price(T=1 - h)) / (2 * h))
+
+@pytest.mark.parametrize("method", ['pathwise', 'likelihood_ratio'])
+def test_monte_carlo_greeks(method):
+    """Monte Carlo Greeks from one simulation agree with the analytic ones."""
+    reference = black_scholes_greeks(100, 105, 1.0, 0.05, 0.2)
+    results = monte_carlo_greeks(100, 105, 1.0, 0.05, 0.2, 50000, num_steps=4,
+                                 rng=np.random.default_rng(8), method=method)
+    for name in GREEKS:
+        assert abs(results[name].estimate - reference[name]) < 5 * results[name].std_error
+    # The price comes from the same paths as monte_carlo_option_price
+    assert np.isclose(results['price'].estimate,
+                      monte_carlo_option_price(100, 105, 1.0, 0.05, 0.2, 50000, 4,
+                                               rng=np.random.default_rng(8)))
+
+def test_mlmc_option_price():
+    """MLMC reaches the target RMSE with level variances that decay with the level."""
+    bs_price = black_scholes_call(100, 105, 1.0, 0.05, 0.2)
+    result, levels = mlmc_option_price(100, 105, 1.0, 0.05, 0.2, 0.05,
+                                       rng=np.random.default_rng(9), full_output=True)
+    assert abs(result.estimate - bs_price) < 3 * 0.05
+    assert result.std_error < 0.05
+    assert result.num_samples == sum(level.num_samples for level in levels)
+    # Correction variances fall and the sample counts follow them down the levels
+    variances = [level.variance for level in levels[1:]]
+    assert all(fine < coarse for coarse, fine in zip(variances, variances[1:]))
+    assert levels[0].num_samples > levels[-1].num_samples
+    assert [level.num_steps for level in levels[:3]] == [1, 2, 4]
+
+    # GBM is exact at the grid points with log_euler, so a European call needs no corrections
+    _, exact_levels = mlmc_option_price(100, 105, 1.0, 0.05, 0.2, 0.05, scheme='log_euler',
+                                        rng=np.random.default_rng(9), full_output=True)
+    assert all(abs(level.mean) < 1e-12 for level in exact_levels[1:])
+
+    with pytest.raises(ValueError, match="needs a barrier"):
+        mlmc_option_price(100, 105, 1.0, 0.05, 0.2, 0.05, payoff='up_and_out')
+
 # Add more tests as needed...
@@ -0,0 +1,49 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add src directory to path to allow importing modules
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from src.parallel import parallel_chains, parallel_estimate, spawn_generators
+from src.mcmc.gibbs_sampling import gibbs_sampler_bivariate_normal
+from src.mcmc.metropolis_hastings import metropolis_sampler, log_target_unnormalized
+from src.monte_carlo.integral_estimation import estimate_integral, g
+from src.monte_carlo.pi_estimation import estimate_pi
+
+def test_spawn_generators_independent_and_reproducible():
+    """Test that spawned streams differ from each other but repeat for the same seed."""
+    first = [rng.standard_normal(5) for rng in spawn_generators(123, 3)]
+    second = [rng.standard_normal(5) for rng in spawn_generators(123, 3)]
+    assert all(np.array_equal(a, b) for a, b in zip(first, second))
+    assert not np.array_equal(first[0], first[1])
+
+def test_parallel_chains_reproducible():
+    """Test that parallel Metropolis chains are bit-for-bit reproducible for a master seed."""
+    kwargs = dict(n_workers=3, seed=7, chains_per_worker=2, log_target=log_target_unnormalized)
+    samples, rates = parallel_chains(metropolis_sampler, None, 1.0, 2000, 200, **kwargs)
+    samples_again, rates_again = parallel_chains(metropolis_sampler, None, 1.0, 2000, 200, **kwargs)
+    assert samples.shape == (6, 1800)
+    assert rates.shape == (6,)
+    assert np.array_equal(samples, samples_again)
+    assert np.array_equal(rates, rates_again)
+
+def test_parallel_chains_gibbs_single_chain_workers():
+    """Test that single-chain workers are stacked into a multi-chain array."""
+    samples = parallel_chains(gibbs_sampler_bivariate_normal, 0, 0, 1, 1, 0.8, 5000, 500,
+                              n_workers=2, seed=1)
+    assert samples.shape == (2, 4500, 2)
+    assert not np.array_equal(samples[0], samples[1])
+
+def test_parallel_estimate():
+    """Test that batched estimates are reproducible and accurate."""
+    pi_est = parallel_estimate(estimate_pi, size_arg='num_points', total=40000, n_workers=4, seed=3)
+    assert pi_est == parallel_estimate(estimate_pi, size_arg='num_points', total=40000,
+                                       n_workers=4, seed=3)
+    assert abs(pi_est - np.pi) < 0.05
+
+    integral_est = parallel_estimate(estimate_integral, g, 0, 1, size_arg='num_samples',
+                                     total=50001, n_workers=3, seed=3)
+    assert abs(integral_est - 1/3) < 0.01
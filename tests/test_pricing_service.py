@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add src directory to path to allow importing modules
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from src.pricing_service import PricingService, price_batch, request
+from src.monte_carlo.option_pricing import (black_scholes_call, monte_carlo_option_price,
+                                           price_option_grid)
+
+def _contract(K, T, payoff='european', num_simulations=20000, num_steps=20, barrier=None):
+    return dict(S0=100.0, K=K, T=T, r=0.05, sigma=0.2, num_simulations=num_simulations,
+                num_steps=num_steps, payoff=payoff, barrier=barrier)
+
+def test_price_batch_matches_black_scholes_and_single_pricing():
+    """Test shared-path prices against Black-Scholes and against pricing one contract alone."""
+    strikes = [90.0, 100.0, 110.0, 100.0]
+    maturities = [0.5, 1.0, 1.0, 2.0]
+    contracts = [_contract(K, T) for K, T in zip(strikes, maturities)]
+    contracts.append(_contract(100.0, 1.0, payoff='asian'))
+    results = price_batch(contracts, seed=3)
+    for (price, std_error), K, T in zip(results, strikes, maturities):
+        assert abs(price - black_scholes_call(100.0, K, T, 0.05, 0.2)) < 4 * std_error
+
+    # A path-dependent contract alone in its group uses the stream like monte_carlo_option_price
+    alone = price_batch([_contract(100.0, 1.0, payoff='asian')], seed=3)[0]
+    expected = monte_carlo_option_price(100.0, 100.0, 1.0, 0.05, 0.2, 20000, 20,
+                                        rng=np.random.default_rng(3), payoff='asian',
+                                        full_output=True)
+    assert alone[0] == pytest.approx(expected.estimate)
+    assert alone[1] == pytest.approx(expected.std_error)
+    assert price_batch(contracts, seed=3) == results
+
+    # European groups are price_option_grid over their strikes and maturities
+    grid, grid_errors = price_option_grid(100.0, [90.0, 100.0, 110.0], [0.5, 1.0, 2.0], 0.05, 0.2,
+                                          20000, rng=np.random.default_rng(3))
+    european = price_batch(contracts[:4], seed=3)
+    for (price, std_error), (i, j) in zip(european, [(0, 0), (1, 1), (1, 2), (2, 1)]):
+        assert price == grid[i, j] and std_error == grid_errors[i, j]
+
+def test_service_batches_concurrent_requests():
+    """Test that concurrent requests are coalesced and answered over TCP, errors included."""
+    async def run():
+        async with PricingService(batch_window=0.05, max_workers=1, seed=0) as service:
+            prices = await asyncio.gather(*[service.price('monte_carlo', S0=100, K=K, T=1,
+                                                          r=0.05, sigma=0.2,
+                                                          num_simulations=20000)
+                                            for K in range(90, 110)])
+            stats = service.stats
+            responses = await request(service.host, service.port, [
+                {'method': 'black_scholes', 'params': dict(S0=100, K=100, T=1, r=0.05, sigma=0.2)},
+                {'method': 'monte_carlo', 'params': dict(S0=100, K=100, T=1, r=0.05, sigma=0.2,
+                                                         payoff='exotic')},
+                {'method': 'stats'}])
+            mixed = await request(service.host, service.port, [
+                {'method': 'monte_carlo', 'params': dict(S0=100, K=100, T=1, r=0.05, sigma=0.2,
+                                                         num_simulations=1000)},
+                {'method': 'monte_carlo', 'params': dict(S0=100, K=100, T=1, r=0.05, sigma=0.2,
+                                                         payoff='up_and_out', barrier='abc')},
+                {'method': 'black_scholes', 'params': dict(S0=100, K=-5, T=1, r=0.05, sigma=0.2)},
+                {'method': 'black_scholes', 'params': dict(S0=100, K=100, T=1, r=0.05, sigma=0)}])
+        return prices, stats, responses, mixed
+
+    prices, stats, responses, mixed = asyncio.run(run())
+    assert stats['batches'] == 1 and stats['mean_batch_size'] == 20
+    assert set(stats['latency']) == {'p50', 'p90', 'p99', 'p99.9'}
+    assert all(np.diff([price for price, _ in prices]) < 0) # Shared paths: monotone in K
+    assert responses[0]['price'] == pytest.approx(black_scholes_call(100, 100, 1, 0.05, 0.2))
+    assert 'Unknown payoff' in responses[1]['error']
+    assert responses[2]['stats']['requests'] == 22
+    # Invalid requests fail alone, without affecting the batch they arrive in
+    assert 'price' in mixed[0] and 'error' in mixed[1] and 'K > 0' in mixed[2]['error']
+    # Without volatility the call is worth its discounted forward intrinsic value
+    assert mixed[3]['price'] == pytest.approx(100 - 100 * np.exp(-0.05))
+
+def test_price_batch_reports_errors_per_group():
+    """Test that a failing group does not fail the other contracts of the batch."""
+    bad = _contract(100.0, 1.0, payoff='up_and_out', barrier=[1])
+    results = price_batch([_contract(100.0, 1.0), bad], seed=0)
+    assert isinstance(results[0], tuple) and isinstance(results[1], Exception)